@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import numpy as np
+
+import properties
+from game_math import Vector
+from game_objects import GameState, Fish, FishKind, BlipType
+
+
+class Belief:
+    """
+    Particle filter for positions and speeds of hidden fishes.
+    Particles of all fishes are kept in arrays (fishes, particles, 2) and updated together:
+    propagated by the referee fish physics, filtered by observations and resampled
+    """
+    PARTICLES = 256
+    JITTER = 30
+    MIRROR_RATE = 0.125
+
+    fish_ids: list[int]
+    fish_ugly: np.ndarray
+    habitat: np.ndarray
+    position: np.ndarray
+    speed: np.ndarray
+    swimming: np.ndarray
+    turn: int | None
+    rng: np.random.Generator
+
+    def __init__(self, state: GameState, particles: int = None, seed: int = None):
+        """
+        Particles are spread over start zones of fishes, symmetric fishes get mirrored particles
+        :param state: Initial state
+        :param particles: Number of particles per fish, default is PARTICLES
+        :param seed: Seed for random generator
+        """
+        if particles is None:
+            particles = Belief.PARTICLES
+        fishes = list(state.fishes.values())
+        self.fish_ids = [fish.fish_id for fish in fishes]
+        self.fish_ugly = np.array([fish.kind == FishKind.ANGLER for fish in fishes], dtype=bool)
+        self.habitat = np.array([properties.HABITAT[fish.kind] for fish in fishes], dtype=np.float64).reshape(-1, 2)
+        self.swimming = np.full(len(fishes), True)
+        self.turn = None
+        self.rng = np.random.default_rng(seed)
+
+        # Start zones
+        low = np.array([(0, properties.MONSTER_MIN_START_Y) if fish.kind == FishKind.ANGLER
+                        else (1000, properties.HABITAT[fish.kind][0] + 1000) for fish in fishes], dtype=np.float64)
+        high = np.array([(properties.MAP_SIZE - 1, properties.MAP_SIZE - 1) if fish.kind == FishKind.ANGLER
+                         else (properties.MAP_SIZE - 1001, properties.HABITAT[fish.kind][1] - 1001)
+                         for fish in fishes], dtype=np.float64)
+        self.position = np.round(self.rng.uniform(low[:, None, :], high[:, None, :], (len(fishes), particles, 2)))
+
+        angle = self.rng.uniform(0, 2 * np.pi, (len(fishes), particles))
+        self.speed = np.round(np.stack((np.cos(angle), np.sin(angle)), axis=2) * properties.FISH_SPEED)
+        self.speed[self.fish_ugly] = 0
+
+        # Symmetric fishes start mirrored
+        index = {fish_id: i for i, fish_id in enumerate(self.fish_ids)}
+        for i, fish_id in enumerate(self.fish_ids):
+            j = index.get(fish_id + 1)
+            if fish_id % 2 == 0 and j is not None:
+                self.position[j], self.speed[j] = Belief.mirror(self.position[i], self.speed[i])
+
+    @staticmethod
+    def mirror(position: np.ndarray, speed: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Particles of symmetric fish
+        """
+        return (np.stack((2 * properties.CENTER.x - position[..., 0], position[..., 1]), axis=-1),
+                np.stack((-speed[..., 0], speed[..., 1]), axis=-1))
+
+    def predict(self, state: GameState) -> None:
+        """
+        Move particles by one turn and get new speed from drones of state (same rules as Referee.get_fish_speed,
+        but without reaction to other fishes, their positions are not known)
+        """
+        position = self.position + self.speed
+        position[..., 0] = np.clip(position[..., 0], 0, properties.MAP_SIZE - 1)
+        position[..., 1] = np.clip(position[..., 1], self.habitat[:, 0:1], self.habitat[:, 1:2])
+        self.position = position
+
+        drones = [drone for drone in state.drones.values() if not drone.emergency]
+        near = np.zeros(position.shape[:2], dtype=bool)
+        flee = np.zeros_like(position)
+
+        if drones:
+            drone_position = np.array([(drone.position.x, drone.position.y) for drone in drones], dtype=np.float64)
+            radius = np.where(self.fish_ugly[:, None], np.array([drone.light_radius for drone in drones])[None, :],
+                              properties.MOTOR_RANGE)
+            delta = position[:, :, None, :] - drone_position[None, None, :, :]
+            dist2 = delta[..., 0] ** 2 + delta[..., 1] ** 2
+            candidates = dist2 <= radius[:, None, :] ** 2
+            dist2 = np.where(candidates, dist2, np.inf)
+            closest = candidates & (dist2 == dist2.min(axis=2, keepdims=True))
+            count = closest.sum(axis=2)
+            near = count > 0
+            flee = position - (closest @ drone_position) / np.maximum(count, 1)[..., None]
+
+        # Direction and length of speed, ugly attacks drone
+        direction = np.where(near[..., None], flee, self.speed)
+        attack = near & self.fish_ugly[:, None]
+        direction[attack] = -direction[attack]
+        length = np.where(near, np.where(self.fish_ugly, properties.MONSTER_ATTACK_SPEED,
+                                         properties.FISH_FRIGHTENED_SPEED)[:, None],
+                          np.where(self.fish_ugly, properties.MONSTER_SPEED, properties.FISH_SPEED)[:, None])
+        norm = np.sqrt(direction[..., 0] ** 2 + direction[..., 1] ** 2)
+        speed = np.divide(direction, norm[..., None], out=np.zeros_like(direction), where=norm[..., None] > 0)
+        speed = speed * length[..., None]
+        slow = self.fish_ugly[:, None] & ~near & (norm <= properties.MONSTER_SPEED)
+        speed[slow] = self.speed[slow]
+
+        # Border, frightened fishes ignore it
+        next_position = position + speed
+        out_x = ~near & ((next_position[..., 0] < 0) | (next_position[..., 0] > properties.MAP_SIZE - 1))
+        out_y = ~near & ((next_position[..., 1] < self.habitat[:, 0:1])
+                         | (next_position[..., 1] > self.habitat[:, 1:2]))
+        speed[out_x, 0] = -speed[out_x, 0]
+        speed[out_y, 1] = -speed[out_y, 1]
+        self.speed = np.round(speed)
+
+    def observe(self, state: GameState) -> np.ndarray:
+        """
+        Apply observations of state to particles
+        :return: Bool array (fishes, particles) of particles which are consistent with observations
+        """
+        valid = np.ones(self.position.shape[:2], dtype=bool)
+        x, y = self.position[..., 0], self.position[..., 1]
+        index = {fish_id: i for i, fish_id in enumerate(self.fish_ids)}
+
+        for i, fish_id in enumerate(self.fish_ids):
+            fish = state.fishes.get(fish_id)
+
+            # Lost fish is not tracked
+            if fish is None:
+                self.swimming[i] = False
+                continue
+
+            # Visible fish has exact position
+            if fish.last_seen == 0:
+                self.position[i] = fish.position.x, fish.position.y
+                self.speed[i] = (0, 0) if fish.speed is None else (fish.speed.x, fish.speed.y)
+                continue
+
+            # Symmetric fish is visible: some particles are mirrored from it
+            sfish = state.get_symmetric_fish(fish)
+            if sfish is not None and sfish.last_seen == 0 and sfish.speed is not None:
+                count = int(len(valid[i]) * Belief.MIRROR_RATE)
+                self.position[i, :count], self.speed[i, :count] = Belief.mirror(
+                    np.array([sfish.position.x, sfish.position.y]), np.array([sfish.speed.x, sfish.speed.y]))
+
+            for drone in state.drones.values():
+                dx, dy = x[i] - drone.position.x, y[i] - drone.position.y
+
+                if drone.player_id == 0:
+                    # Radar
+                    blip = drone.radar_blips[fish_id]
+                    if blip is not None:
+                        left = blip == BlipType.TL or blip == BlipType.BL
+                        top = blip == BlipType.TL or blip == BlipType.TR
+                        valid[i] &= (dx <= 0) == left
+                        valid[i] &= (dy <= 0) == top
+
+                    # My light does not see it
+                    if not drone.emergency:
+                        radius = drone.light_radius
+                        if self.fish_ugly[i]:
+                            radius += properties.MONSTER_DETECTED_RADIUS_ADD
+                        valid[i] &= dx ** 2 + dy ** 2 > radius ** 2
+
+                # Enemy has just scanned it
+                elif drone.new_scans >> fish_id & 1:
+                    scanned = valid[i] & (dx ** 2 + dy ** 2 <= drone.light_radius ** 2)
+                    if scanned.any():
+                        valid[i] = scanned
+
+        # Visible and lost fishes are not filtered
+        for fish_id, fish in state.fishes.items():
+            if fish.last_seen == 0 and fish_id in index:
+                valid[index[fish_id]] = True
+        valid[~self.swimming] = True
+
+        return valid
+
+    def resample(self, valid: np.ndarray, state: GameState) -> None:
+        """
+        Replace inconsistent particles by copies of consistent ones with small jitter.
+        If there are no consistent particles, fish is spread again over its radar zone
+        """
+        particles = valid.shape[1]
+        counts = valid.sum(axis=1)
+
+        for i in np.nonzero(counts < particles)[0]:
+            if counts[i] == 0:
+                self.respawn(i, state)
+                continue
+
+            # systematic resampling
+            cdf = np.cumsum(valid[i]) / counts[i]
+            chosen = np.searchsorted(cdf, (np.arange(particles) + self.rng.random()) / particles)
+            self.position[i] = self.position[i, chosen]
+            self.speed[i] = self.speed[i, chosen]
+
+            self.position[i] += self.rng.integers(-Belief.JITTER, Belief.JITTER + 1, (particles, 2))
+
+        self.position[..., 0] = np.clip(self.position[..., 0], 0, properties.MAP_SIZE - 1)
+        self.position[..., 1] = np.clip(self.position[..., 1], self.habitat[:, 0:1], self.habitat[:, 1:2])
+
+    def respawn(self, i: int, state: GameState) -> None:
+        """
+        Spread particles of fish uniformly over its habitat limited by radar of my drones
+        """
+        low = np.array([0, self.habitat[i, 0]])
+        high = np.array([properties.MAP_SIZE - 1, self.habitat[i, 1]])
+
+        for drone in state.drones.values():
+            if drone.player_id == 0 and drone.radar_blips[self.fish_ids[i]] is not None:
+                zone = drone.get_range_by_radar(self.fish_ids[i])
+                low = np.maximum(low, (zone.from_.x, zone.from_.y))
+                high = np.minimum(high, (zone.to.x, zone.to.y))
+
+        self.position[i] = np.round(self.rng.uniform(low, np.maximum(low, high), self.position[i].shape))
+        angle = self.rng.uniform(0, 2 * np.pi, len(self.position[i]))
+        speed = properties.MONSTER_SPEED if self.fish_ugly[i] else properties.FISH_SPEED
+        self.speed[i] = np.round(np.stack((np.cos(angle), np.sin(angle)), axis=1) * speed)
+
+    def update(self, state: GameState) -> None:
+        """
+        Update belief by the new turn state
+        """
+        if self.turn is not None:
+            for _ in range(state.turn - self.turn):
+                self.predict(state)
+        self.turn = state.turn
+        self.resample(self.observe(state), state)
+
+    def estimate(self, i: int) -> tuple[Vector, Vector]:
+        """
+        Particle which is the closest to the mean of particles of fish
+        :return: Position and speed
+        """
+        mean = self.position[i].mean(axis=0)
+        delta = self.position[i] - mean
+        best = int(np.argmin(delta[:, 0] ** 2 + delta[:, 1] ** 2))
+        return Vector(*self.position[i, best].tolist()), Vector(*self.speed[i, best].tolist())
+
+    def get_spread(self, fish: Fish, quantile: float = 1.0) -> float:
+        """
+        Distance from fish within which the quantile of its particles are, 0 for fish which is not tracked
+        :param quantile: Share of particles, default is all of them
+        """
+        if fish.fish_id not in self.fish_ids:
+            return 0.0
+        delta = self.position[self.fish_ids.index(fish.fish_id)] - (fish.position.x, fish.position.y)
+        return float(np.sqrt(np.quantile(delta[:, 0] ** 2 + delta[:, 1] ** 2, quantile)))
+
+    def apply(self, state: GameState) -> None:
+        """
+        Set estimated position and speed for hidden fishes of state
+        """
+        for i, fish_id in enumerate(self.fish_ids):
+            fish = state.fishes.get(fish_id)
+            if fish is not None and fish.last_seen > 0:
+                fish.position, fish.speed = self.estimate(i)
+
+    def sample(self, state: GameState) -> GameState:
+        """
+        Concrete world: fork of state where hidden fishes get random particles
+        """
+        state = state.fork()
+        chosen = self.rng.integers(0, self.position.shape[1], len(self.fish_ids))
+
+        for i, fish_id in enumerate(self.fish_ids):
+            fish = state.fishes.get(fish_id)
+            if fish is not None and fish.last_seen > 0:
+                fish.position = Vector(*self.position[i, chosen[i]].tolist())
+                fish.speed = Vector(*self.speed[i, chosen[i]].tolist())
+
+        return state
@@ -0,0 +1,336 @@
+from __future__ import annotations
+import argparse
+import io
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Callable
+
+import properties
+from belief import Belief
+from decisions import Decision
+from game_input import GameReader
+from game_math import Vector
+from game_objects import GameState, Fish, FishColor, FishKind, Drone
+from referee import Referee
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks_baseline.json')
+REGRESSION = 0.05
+CALIBRATION = 'calibration'
+ROUNDS = 9
+NOISE_SIGMAS = 2
+# standard error of median is 1.25 sigma / sqrt(n), sigma is interquartile range / 1.35
+MEDIAN_ERROR = 1.2533 / 1.349
+# peak memory of small calls changes by free lists and dict resizes
+MEMORY_SLACK = 1024
+
+
+class AllocationCounter:
+    """
+    Counts Vector constructions and the peak of traced memory while active, NumPy buffers are traced too
+    """
+    count: int
+    peak: int
+    __start: int
+    __tracing: bool
+
+    def __init__(self):
+        self.count = 0
+        self.peak = 0
+        self.__start = 0
+        self.__tracing = False
+        self.__init_vector = Vector.__init__
+
+    def __enter__(self) -> AllocationCounter:
+        init_vector = self.__init_vector
+
+        def counted_init(vector: Vector, *args):
+            self.count += 1
+            init_vector(vector, *args)
+
+        Vector.__init__ = counted_init
+        self.__tracing = tracemalloc.is_tracing()
+        if not self.__tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.__start, _ = tracemalloc.get_traced_memory()
+        return self
+
+    def __exit__(self, *args) -> None:
+        Vector.__init__ = self.__init_vector
+        _, peak = tracemalloc.get_traced_memory()
+        self.peak = peak - self.__start
+        if not self.__tracing:
+            tracemalloc.stop()
+
+
+def measure(benchmarks: dict[str, Callable[[], object]],
+            rounds: int = ROUNDS) -> dict[str, tuple[float, float, int, int]]:
+    """
+    Measure calls of benchmarks by CPU time of the process, so time of other processes is not counted.
+    Timings go in rounds over all benchmarks and every timing is divided by the calibration timing of its round,
+    so slow periods of the machine are cancelled
+    :param benchmarks: Functions without arguments by name, with CALIBRATION
+    :param rounds: Timings of every benchmark
+    :return: By name: time of call in microseconds (median of calibrated timings at median calibration),
+    relative spread of calibrated timings (interquartile range to median), Vector allocations per call
+    and peak of memory allocated by call in bytes
+    """
+    timers, allocations = {}, {}
+    for name, func in benchmarks.items():
+        # the first call warms caches up
+        func()
+        with AllocationCounter() as counter:
+            func()
+        allocations[name] = counter.count, counter.peak
+        timer = timeit.Timer(func, timer=time.process_time)
+        timers[name] = timer, timer.autorange()[0]
+
+    timings = {name: [] for name in benchmarks}
+    for _ in range(rounds):
+        for name, (timer, number) in timers.items():
+            timings[name].append(timer.timeit(number) / number * 1e6)
+
+    calibration = timings[CALIBRATION]
+    scale = statistics.median(calibration)
+    results = {}
+    for name, values in timings.items():
+        calibrated = [value / base for value, base in zip(values, calibration)]
+        median = statistics.median(calibrated)
+        low, _, high = statistics.quantiles(calibrated, n=4)
+        results[name] = (median * scale if name != CALIBRATION else scale, (high - low) / median) + allocations[name]
+    return results
+
+
+def calibrate() -> None:
+    """
+    Pure interpreter loop, times are compared with baseline relative to it, so speed of machine is cancelled
+    """
+    total = 0
+    for i in range(1000):
+        total += i * i
+
+
+def report(results: dict[str, tuple[float, float, int, int]], baseline: dict[str, list[float]] = None,
+           threshold: float = REGRESSION, rounds: int = ROUNDS) -> int:
+    """
+    Print results as table, compared with baseline if it is given.
+    Change is noise while it is within NOISE_SIGMAS standard errors of difference of both medians
+    :param threshold: The least relative slowdown which is regression, also for peak memory
+    :param rounds: Timings of every benchmark in both measurements
+    :return: Number of regressions: slower than baseline beyond noise, more Vectors or more memory
+    """
+    baseline = baseline or {}
+    scale = results[CALIBRATION][0] / baseline[CALIBRATION][0] if CALIBRATION in baseline else 1
+    regressions = 0
+    width = max(len(name) for name in results)
+    print(f"{'benchmark':<{width}}  {'us/call':>9}  {'spread':>6}  {'allocs':>6}  {'peak kB':>8}  {'base us':>9}  "
+          f"{'change':>7}  {'noise':>6}")
+
+    for name, (elapsed, spread, allocations, peak) in results.items():
+        line = f"{name:<{width}}  {elapsed:>9.3f}  {spread:>6.1%}  {allocations:>6}  {peak / 1024:>8.1f}"
+        if name in baseline and name != CALIBRATION:
+            base_time, base_spread, base_allocations, base_peak = baseline[name]
+            change = elapsed / (base_time * scale) - 1
+            noise = max(NOISE_SIGMAS * MEDIAN_ERROR * math.hypot(spread, base_spread) / math.sqrt(rounds), threshold)
+            regression = change > noise or allocations > base_allocations or peak > base_peak * (1 + threshold) + MEMORY_SLACK
+            regressions += regression
+            line += f"  {base_time:>9.3f}  {change:>+7.1%}  {noise:>6.1%}{'  !' if regression else ''}"
+        print(line)
+
+    return regressions
+
+
+def bench_math() -> dict[str, Callable[[], object]]:
+    """
+    Vector kernel: composed expressions (as the hot paths used to be written) against direct variants
+    """
+    a, b, r = Vector(1200, 4300), Vector(1800, 3900), 800
+    coords = [Vector(x * 701 % 10000, x * 307 % 10000) for x in range(16)]
+
+    def composed_closest() -> list[Vector]:
+        in_range = [c for c in coords if (c + (-a)).in_range(r * 6)]
+        closest, min_dist = [], 0
+        for c in in_range:
+            dist = (a + (-c)).length2()
+            if not closest or dist < min_dist:
+                closest, min_dist = [c], dist
+            elif dist == min_dist:
+                closest.append(c)
+        return closest
+
+    return {
+        'distance2 composed': lambda: (a + (-b)).length2(),
+        'distance2': lambda: a.distance2(b),
+        'distance2_xy': lambda: a.distance2_xy(1800, 3900),
+        'in_range_vec composed': lambda: (b + (-a)).in_range(r),
+        'in_range_vec': lambda: a.in_range_vec(b, r),
+        'in_range_xy': lambda: a.in_range_xy(1800, 3900, r),
+        'get_closest composed': composed_closest,
+        'get_closest_in_range': lambda: a.get_closest_in_range(coords, r * 6),
+    }
+
+
+def make_state(seed: int = 0) -> GameState:
+    """
+    Synthetic mid-game state: 12 fishes, 4 uglies and 2 drones per player, all fishes are visible
+    """
+    rng = random.Random(seed)
+    state = GameState()
+    state.turn = 10
+
+    for i in range(12):
+        fish = Fish(4 + i, FishColor(i % 4), FishKind(i // 4))
+        habitat = properties.HABITAT[fish.kind]
+        if fish.fish_id % 2 == 0:
+            fish.position = Vector(rng.randrange(properties.MAP_SIZE), rng.randrange(*habitat))
+            fish.speed = Vector(rng.randint(-200, 200), rng.randint(-200, 200))
+        else:  # symmetric
+            sfish = state.fishes[fish.fish_id - 1]
+            fish.position = sfish.position.hsymm(properties.CENTER.x)
+            fish.speed = sfish.speed.hsymm()
+        fish.last_seen = 0
+        state.fishes[fish.fish_id] = fish
+
+    for i in range(4):
+        fish = Fish(16 + i)
+        fish.position = Vector(rng.randrange(properties.MAP_SIZE), rng.randrange(properties.MONSTER_MIN_START_Y,
+                                                                                  properties.MAP_SIZE))
+        fish.speed = Vector(rng.randint(-270, 270), rng.randint(-270, 270))
+        fish.last_seen = 0
+        state.fishes[fish.fish_id] = fish
+
+    for drone_id in range(4):
+        drone = Drone(drone_id, drone_id % 2, state.get_fish_limit())
+        drone.position = Vector(rng.randrange(properties.MAP_SIZE), rng.randrange(properties.MAP_SIZE))
+        drone.light_radius = rng.choice((properties.DARK_SCAN_RADIUS, properties.LIGHT_SCAN_RADIUS))
+        drone.scans = sum(1 << fish_id for fish_id in range(4, 16) if rng.random() < 0.3)
+        state.drones[drone_id] = drone
+
+    state.get_score_table()
+    return state
+
+
+def make_plan(state: GameState, seed: int = 0, depth: int = 20) -> list[Decision]:
+    """
+    Random plan for drones of both players
+    """
+    rng = random.Random(seed)
+    plan = []
+    for drone_id in state.drones:
+        for _ in range(2):
+            plan.append(Decision(drone_id, (rng.randrange(properties.MAP_SIZE), rng.randrange(properties.MAP_SIZE)),
+                                 rng.random() < 0.3, depth // 2))
+    return plan
+
+
+def format_turn(state: GameState) -> bytes:
+    """
+    Protocol input of turn for my player, my drones see all fishes
+    """
+    lines = [state.score[0], state.score[1]]
+    for player_id in range(2):
+        fish_ids = [fish_id for fish_id in state.fishes if state.scans[player_id] >> fish_id & 1]
+        lines += [len(fish_ids)] + fish_ids
+    for player_id in range(2):
+        drones = [drone for drone in state.drones.values() if drone.player_id == player_id]
+        lines += [len(drones)] + [f"{drone.drone_id} {round(drone.position.x)} {round(drone.position.y)} \
+{int(drone.emergency)} {drone.battery}" for drone in drones]
+    scans = [f"{drone.drone_id} {fish_id}" for drone in state.drones.values() for fish_id in state.fishes
+             if drone.scans >> fish_id & 1]
+    lines += [len(scans)] + scans
+    lines += [len(state.fishes)] + [f"{fish.fish_id} {round(fish.position.x)} {round(fish.position.y)} \
+{round(fish.speed.x)} {round(fish.speed.y)}" for fish in state.fishes.values()]
+    blips = [f"{drone.drone_id} {fish.fish_id} {'T' if fish.position.y < drone.position.y else 'B'}\
+{'L' if fish.position.x < drone.position.x else 'R'}"
+             for drone in state.drones.values() if drone.player_id == 0 for fish in state.fishes.values()]
+    lines += [len(blips)] + blips
+    return '\n'.join(str(line) for line in lines).encode() + b'\n'
+
+
+def bench_game(state: GameState) -> dict[str, Callable[[], object]]:
+    """
+    Referee and bot hot paths on state. Benchmarks which change state work on its fork, fork is measured alone
+    """
+    referee = Referee(state, True)
+    fish = next(fish for fish in state.fishes.values() if fish.kind != FishKind.ANGLER)
+    ugly = next(fish for fish in state.fishes.values() if fish.kind == FishKind.ANGLER)
+    plan = make_plan(state)
+    data = format_turn(state)
+
+    # the bot reads the turn and loses half of fishes from view
+    previous = state.fork()
+    previous.turn -= 1
+    hidden = GameReader(io.BytesIO(data)).read_state(previous)
+    for fish_id in list(hidden.fishes)[::2]:
+        hidden.fishes[fish_id].last_seen = 1
+    belief = Belief(hidden, seed=0)
+
+    def update_belief():
+        # belief is one turn behind, so particles are predicted too
+        belief.turn = hidden.turn - 1
+        belief.update(hidden)
+        belief.apply(hidden)
+
+    return {
+        'state.fork': state.fork,
+        'get_fish_speed': lambda: referee.get_fish_speed(fish),
+        'get_ugly_speed': lambda: referee.get_ugly_speed(ugly),
+        'update_positions': lambda: Referee(state.fork()).update_positions(),
+        'do_scan': lambda: Referee(state.fork()).do_scan(),
+        'do_report': lambda: Referee(state.fork()).do_report(),
+        'simulate 20 turns': lambda: Referee.simulate(state, plan, 20),
+        'read_state': lambda: GameReader(io.BytesIO(data)).read_state(previous),
+        'belief update': update_belief,
+    }
+
+
+def load_state(path: str, turn: int) -> GameState:
+    """
+    State of recorded game on turn
+    """
+    from turn_log import TurnLog
+
+    with TurnLog(path) as log:
+        reader = GameReader(log.input_stream())
+        state = reader.read_initialize()
+        while state.turn < turn:
+            state = reader.read_state(state)
+
+    # speed of hidden fishes is needed by the referee
+    for fish in state.fishes.values():
+        if fish.speed is None:
+            fish.speed = Vector()
+    return state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks of hot paths")
+    parser.add_argument('--log', help="Turn log for state, default is synthetic state")
+    parser.add_argument('--turn', type=int, default=10, help="Turn of logged game")
+    parser.add_argument('--save', action='store_true', help="Store results as new baseline")
+    parser.add_argument('--baseline', default=BASELINE, help="Baseline file")
+    parser.add_argument('--threshold', type=float, default=REGRESSION, help="Relative slowdown which is regression")
+    args = parser.parse_args()
+
+    benchmarks = {CALIBRATION: calibrate}
+    benchmarks.update(bench_math())
+    benchmarks.update(bench_game(make_state() if args.log is None else load_state(args.log, args.turn)))
+    results = measure(benchmarks)
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=1)
+        report(results)
+    else:
+        baseline = None
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        sys.exit(1 if report(results, baseline, args.threshold) else 0)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import numpy as np
+
+import properties
+
+
+def get_swept_collisions(drone_start: np.ndarray, drone_end: np.ndarray,
+                         monster_start: np.ndarray, monster_end: np.ndarray,
+                         radius: int = properties.MONSTER_ATTACK_RADIUS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Continuous collision of every drone with every monster, both move linearly during the turn.
+    Drone is hit if monster is already in range or their relative motion enters the range for 0 < t <= 1,
+    same as Referee.is_collision
+    :param drone_start: Positions of drones (..., drones, 2)
+    :param drone_end: Positions of drones after the turn (..., drones, 2)
+    :param monster_start: Positions of monsters (..., monsters, 2)
+    :param monster_end: Positions of monsters after the turn (..., monsters, 2)
+    :param radius: Attack radius
+    :return: Hit flags and time of impact (inf if no hit) of pairs (..., drones, monsters)
+    """
+    relative = monster_start[..., None, :, :] - drone_start[..., :, None, :]
+    speed = (monster_end - monster_start)[..., None, :, :] - (drone_end - drone_start)[..., :, None, :]
+    x, y, vx, vy = relative[..., 0], relative[..., 1], speed[..., 0], speed[..., 1]
+
+    # Solve |(x, y) + t * (vx, vy)| = radius, the first root is the entry
+    a = vx * vx + vy * vy
+    b = 2 * (x * vx + y * vy)
+    c = x * x + y * y - radius * radius
+    delta = b * b - 4 * a * c
+    moving = (a > 0) & (delta >= 0)
+    t = np.divide(-b - np.sqrt(np.where(moving, delta, 0)), 2 * a, out=np.full(a.shape, np.inf), where=moving)
+
+    inside = c <= 0
+    hit = inside | ((t > 0) & (t <= 1))
+    return hit, np.where(inside, 0, np.where(hit, t, np.inf))
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import math
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+import properties
+from game_objects import GameState, FishKind
+
+if TYPE_CHECKING:
+    from belief import Belief
+
+
+class DangerField:
+    """
+    Places where my drone can be caught by ugly during the next turn.
+    Visible ugly moves by its speed, hidden one can move anywhere within attack speed from its particles,
+    so its attack radius is greater. With all particles the field is a bound: a drone it marks safe is not caught
+    in any world of belief.
+    Every cell of coarse grid keeps its clearance: how far a drone can be from the cell and still be surely safe.
+    Moves which stay within clearance are safe at once, only the rest are checked exactly
+    """
+    CELL = 500
+
+    __cells: int
+    __clearance: list[list[float]]
+    __uglies: list[tuple[list[float], list[float], float]]
+    clearance: np.ndarray
+    position: np.ndarray
+    speed: np.ndarray
+    radius: np.ndarray
+
+    def __init__(self, state: GameState, belief: Belief = None, quantile: float = 1.0):
+        """
+        :param state: State with positions and speeds of uglies by belief
+        :param belief: Belief about hidden uglies, their radius grows by spread of particles
+        :param quantile: Share of particles of hidden ugly which are covered, default is all of them
+        """
+        uglies = [fish for fish in state.fishes.values() if fish.kind == FishKind.ANGLER]
+        known = [fish.last_seen == 0 and fish.speed is not None for fish in uglies]
+        self.position = np.array([(fish.position.x, fish.position.y) for fish in uglies],
+                                 dtype=np.float64).reshape(len(uglies), 2)
+        self.speed = np.array([(fish.speed.x, fish.speed.y) if is_known else (0, 0)
+                               for fish, is_known in zip(uglies, known)], dtype=np.float64).reshape(len(uglies), 2)
+        spread = [0.0 if belief is None else belief.get_spread(fish, quantile) for fish in uglies]
+        # hidden speed is rounded, it can be a bit longer than attack speed
+        self.radius = np.where(known, properties.MONSTER_ATTACK_RADIUS,
+                               properties.MONSTER_ATTACK_RADIUS + properties.MONSTER_ATTACK_SPEED + 1
+                               + np.array(spread, dtype=np.float64)).astype(np.float64)
+
+        # Distance from cell centers (row of y, column of x) to path of every ugly
+        self.__cells = (properties.MAP_SIZE - 1) // DangerField.CELL + 1
+        centers = (np.arange(self.__cells) + 0.5) * DangerField.CELL
+        centers = np.stack(np.meshgrid(centers, centers, indexing='ij'), axis=-1)[..., None, ::-1]
+        length2 = np.maximum((self.speed ** 2).sum(axis=1), 1e-9)
+        t = np.clip(((centers - self.position) * self.speed).sum(axis=-1) / length2, 0, 1)
+        delta = centers - (self.position + t[..., None] * self.speed)
+        distance = np.sqrt((delta ** 2).sum(axis=-1))
+
+        # Any point of cell is within half diagonal from its center
+        half_diagonal = DangerField.CELL * np.sqrt(0.5)
+        self.clearance = (distance - self.radius).min(axis=-1, initial=np.inf) - half_diagonal
+
+        # single queries are faster without numpy
+        self.__clearance = self.clearance.tolist()
+        self.__uglies = list(zip(self.position.tolist(), self.speed.tolist(), self.radius.tolist()))
+
+    def get_cell(self, value: float) -> int:
+        return min(max(int(value // DangerField.CELL), 0), self.__cells - 1)
+
+    def is_safe(self, start: tuple[float, float], end: tuple[float, float]) -> bool:
+        """
+        Drone moving from start to end during the turn can't be caught by any ugly.
+        Every point of move is within half of its length from the middle
+        """
+        middle = (start[0] + end[0]) / 2, (start[1] + end[1]) / 2
+        column, row = self.get_cell(middle[0]), self.get_cell(middle[1])
+        # middle out of map is farther from its cell
+        outside = math.hypot(middle[0] - min(max(middle[0], 0), properties.MAP_SIZE - 1),
+                           middle[1] - min(max(middle[1], 0), properties.MAP_SIZE - 1))
+        if math.hypot(end[0] - start[0], end[1] - start[1]) / 2 + outside < self.__clearance[row][column]:
+            return True
+
+        # Relative motion, the closest distance over the turn
+        drone_speed = end[0] - start[0], end[1] - start[1]
+        for (x, y), (vx, vy), radius in self.__uglies:
+            x, y = x - start[0], y - start[1]
+            vx, vy = vx - drone_speed[0], vy - drone_speed[1]
+            a = vx * vx + vy * vy
+            t = min(max(-(x * vx + y * vy) / a, 0), 1) if a > 0 else 0
+            x, y = x + t * vx, y + t * vy
+            if x * x + y * y <= radius * radius:
+                return False
+        return True
+
+    def get_safe(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """
+        Batch of is_safe, moves far from uglies are not checked exactly
+        :param start: Positions of drones (..., 2)
+        :param end: Positions of drones after the turn (..., 2)
+        :return: Bool array (...)
+        """
+        start, end = np.broadcast_arrays(start, end)
+        middle = (start + end) / 2
+        inside = np.clip(middle, 0, properties.MAP_SIZE - 1)
+        cell = np.clip((middle // DangerField.CELL).astype(np.int64), 0, self.__cells - 1)
+        reach = np.sqrt(((end - start) ** 2).sum(axis=-1)) / 2 + np.sqrt(((middle - inside) ** 2).sum(axis=-1))
+        safe = reach < self.clearance[cell[..., 1], cell[..., 0]]
+        if safe.all():
+            return safe
+
+        near = ~safe
+        start, end = start[near], end[near]
+        relative = self.position - start[..., None, :]
+        speed = self.speed - (end - start)[..., None, :]
+        a = (speed ** 2).sum(axis=-1)
+        t = np.clip(np.divide(-(relative * speed).sum(axis=-1), a, out=np.zeros_like(a), where=a > 0), 0, 1)
+        closest = relative + t[..., None] * speed
+        safe[near] = ~((closest ** 2).sum(axis=-1) <= self.radius ** 2).any(axis=-1)
+        return safe
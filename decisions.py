@@ -1,2 +1,59 @@
+from __future__ import annotations
+
+
 class Decision:
-    pass
+    """
+    Command for one drone for several turns: move to waypoint (or wait) with light indicator.
+    List of decisions is a plan: decisions of every drone are executed one after another,
+    drone without decision goes to the surface
+    """
+    __slots__ = ('drone_id', 'position', 'light', 'turns')
+
+    drone_id: int
+    position: tuple[int, int] | None
+    light: bool
+    turns: int
+
+    def __init__(self, drone_id: int, position: tuple[int, int] | None = None, light: bool = False, turns: int = 1):
+        """
+        :param drone_id: Drone for command
+        :param position: Waypoint, None is wait (sink)
+        :param light: Light indicator
+        :param turns: Number of turns for command
+        """
+        self.drone_id = drone_id
+        self.position = position
+        self.light = light
+        self.turns = turns
+
+    def __str__(self):
+        return f"[{self.drone_id}] {'WAIT' if self.position is None else self.position} {int(self.light)} x{self.turns}"
+
+    @staticmethod
+    def get_turn_decisions(decisions: list[Decision], turn: int) -> list[Decision]:
+        """
+        Decisions of plan which are active on the turn
+        :param decisions: Plan
+        :param turn: Turn from the beginning of plan
+        :return: List with one decision per drone, drones with finished plan are skipped
+        """
+        passed, active = {}, {}
+
+        for decision in decisions:
+            if decision.drone_id not in active:
+                start = passed.get(decision.drone_id, 0)
+                if start + decision.turns > turn:
+                    active[decision.drone_id] = decision
+                passed[decision.drone_id] = start + decision.turns
+
+        return list(active.values())
+
+    @staticmethod
+    def get_length(decisions: list[Decision]) -> int:
+        """
+        Number of turns of the longest drone plan
+        """
+        lengths = {}
+        for decision in decisions:
+            lengths[decision.drone_id] = lengths.get(decision.drone_id, 0) + decision.turns
+        return max(lengths.values(), default=0)
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class FishColor(Enum):
+    UGLY, PINK, YELLOW, GREEN, BLUE = range(-1, 4)
+
+
+class FishKind(Enum):
+    ANGLER, JELLY, FISH, CRAB = range(-1, 3)
@@ -75,4 +75,4 @@ class GameActionMove(GameAction):
         self.light = light
 
     def __str__(self):
-        return super().__str__() + f" {self.position} {int(self.light)} {self.text}"
+        return super().__str__() + f" {self.position[0]} {self.position[1]} {int(self.light)} {self.text}"
@@ -0,0 +1,212 @@
+from __future__ import annotations
+import sys
+import time
+from typing import BinaryIO, Callable
+
+import properties
+from game_math import Vector, RectangleRange
+from game_objects import GameState, Fish, FishColor, FishKind, Drone, BlipType
+from scan_mask import fish_bit
+
+BLIPS = {blip.name.encode(): blip for blip in BlipType}
+
+
+class TokenReader:
+    """
+    Tokens of binary stream. All available bytes are read at once and split in one pass,
+    stream is read again only when tokens are exhausted
+    """
+    CHUNK = 1 << 16
+
+    __stream: BinaryIO
+    __tokens: list[bytes]
+    __index: int
+    __rest: bytes
+
+    def __init__(self, stream: BinaryIO = None):
+        """
+        :param stream: Binary stream, default is standard input
+        """
+        self.__stream = sys.stdin.buffer if stream is None else stream
+        self.__tokens = []
+        self.__index = 0
+        self.__rest = b''
+
+    def __fill(self) -> None:
+        while self.__index >= len(self.__tokens):
+            read = getattr(self.__stream, 'read1', self.__stream.read)
+            chunk = read(TokenReader.CHUNK)
+            if not chunk:
+                if not self.__rest:
+                    raise EOFError
+                self.__tokens, self.__index, self.__rest = [self.__rest], 0, b''
+                return
+
+            # last token can be cut in the middle
+            data = self.__rest + chunk
+            if data[-1:].isspace():
+                self.__tokens, self.__rest = data.split(), b''
+            else:
+                cut = max(data.rfind(b' '), data.rfind(b'\n')) + 1
+                self.__tokens, self.__rest = data[:cut].split(), data[cut:]
+            self.__index = 0
+
+    def wait(self) -> None:
+        """
+        Block until the next token is available
+        """
+        if self.__index >= len(self.__tokens):
+            self.__fill()
+
+    def next_token(self) -> bytes:
+        if self.__index >= len(self.__tokens):
+            self.__fill()
+        token = self.__tokens[self.__index]
+        self.__index += 1
+        return token
+
+    def next_int(self) -> int:
+        return int(self.next_token())
+
+    def next_tokens(self, count: int) -> list[bytes]:
+        """
+        Slice of the next count tokens
+        """
+        end = self.__index + count
+        if end <= len(self.__tokens):
+            tokens = self.__tokens[self.__index:end]
+            self.__index = end
+            return tokens
+        return [self.next_token() for _ in range(count)]
+
+    def next_ints(self, count: int) -> list[int]:
+        return list(map(int, self.next_tokens(count)))
+
+
+class GameReader:
+    """
+    Reader of the game protocol, fills state directly from tokens of input
+    """
+    reader: TokenReader
+    parse_time: float
+
+    def __init__(self, stream: BinaryIO = None):
+        """
+        :param stream: Binary stream, default is standard input
+        """
+        self.reader = TokenReader(stream)
+        self.parse_time = 0
+
+    def read_initialize(self) -> GameState:
+        """
+        Read from input initial state
+        :return: State with fish info
+        """
+        next_int = self.reader.next_int
+        state = GameState()
+
+        for i in range(next_int()):
+            fish = Fish(next_int(), FishColor(next_int()), FishKind(next_int()))
+            state.fishes[fish.fish_id] = fish
+
+        # 2^n table is built once here, out of turn time
+        state.get_score_table()
+        return state
+
+    def read_state(self, state: GameState, on_input: Callable[[], None] = None) -> GameState:
+        """
+        Read from input game state
+        :param state: Previous state
+        :param on_input: Called when the first data of the turn arrives, before it is parsed
+        :return: State for next turn
+        """
+        next_int, next_ints = self.reader.next_int, self.reader.next_ints
+
+        # The turn begins when its first data arrives
+        self.reader.wait()
+        start = time.perf_counter()
+        if on_input is not None:
+            on_input()
+
+        new_state = state.fork()
+        new_state.time = start
+        new_state.turn += 1
+        for fish in new_state.fishes.values():
+            fish.last_seen += 1
+
+        # Score
+        new_state.score = next_int(), next_int()
+
+        # Scans
+        scans = [0, 0]
+        for player_id in range(2):
+            for fish_id in next_ints(next_int()):
+                scans[player_id] |= fish_bit(fish_id)
+        new_state.scans = scans[0], scans[1]
+
+        # Drones
+        drones = new_state.drones
+        for player_id in range(2):
+            inputs = next_ints(next_int() * 5)
+            for i in range(0, len(inputs), 5):
+                drone_id, x, y, emergency, battery = inputs[i:i + 5]
+
+                drone = drones.get(drone_id)
+                if drone is None:
+                    drone = drones[drone_id] = Drone(drone_id, player_id, new_state.get_fish_limit())
+                last_drone = state.drones.get(drone_id)
+
+                if last_drone is None:
+                    drone.position = Vector(x, y)
+                    drone.speed = Vector()
+                else:
+                    position = last_drone.position
+                    if position.x != x or position.y != y:
+                        drone.position = Vector(x, y)
+                    drone.speed = Vector(x - position.x, y - position.y)
+                drone.motor_on = drone.speed.x != 0 or drone.speed.y != properties.DRONE_SINK_SPEED
+                drone.emergency = emergency
+                drone.battery = battery
+                drone.lighting = battery < (properties.MAX_BATTERY if last_drone is None else last_drone.battery)
+                drone.light_radius = properties.LIGHT_SCAN_RADIUS if drone.lighting else properties.DARK_SCAN_RADIUS
+
+                drone.scans = 0
+                drone.clear_blips()
+
+        # Drone's scans
+        inputs = next_ints(next_int() * 2)
+        for i in range(0, len(inputs), 2):
+            drones[inputs[i]].scans |= fish_bit(inputs[i + 1])
+
+        # Drone's new scans
+        if state.drones:
+            for drone in drones.values():
+                drone.new_scans = drone.scans & ~state.drones[drone.drone_id].scans
+
+        # Visible fishes
+        fishes = new_state.fishes
+        inputs = next_ints(next_int() * 5)
+        for i in range(0, len(inputs), 5):
+            fish = fishes[inputs[i]]
+
+            fish.position = Vector(inputs[i + 1], inputs[i + 2])
+            fish.speed = Vector(inputs[i + 3], inputs[i + 4])
+            fish.location = RectangleRange(fish.position, fish.position)
+            fish.last_seen = 0
+
+        # Radar blips
+        lost_fishes = set(fishes.keys())
+
+        inputs = self.reader.next_tokens(next_int() * 3)
+        for i in range(0, len(inputs), 3):
+            fish_id = int(inputs[i + 1])
+
+            drones[int(inputs[i])].radar_blips[fish_id] = BLIPS[inputs[i + 2]]
+            lost_fishes.discard(fish_id)
+
+        # Set lost
+        for fish_id in lost_fishes:
+            new_state.lost_fishes[fish_id] = fishes.pop(fish_id)
+
+        self.parse_time = time.perf_counter() - start
+        return new_state
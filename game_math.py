@@ -1,8 +1,14 @@
 from __future__ import annotations
 from math import sqrt, cos, sin
+from typing import Iterable
 
 
 class Vector:
+    """
+    Immutable 2D vector, states share instances by reference
+    """
+    __slots__ = ('__x', '__y')
+
     __x: int | float
     __y: int | float
 
@@ -27,7 +33,7 @@ class Vector:
     __rmul__ = __mul__
 
     def __neg__(self) -> Vector:
-        return self * -1
+        return Vector(-self.__x, -self.__y)
 
     def __truediv__(self, other: int | float) -> Vector:
         return Vector(self.__x / other, self.__y / other)
@@ -38,11 +44,16 @@ class Vector:
         else:
             return Vector(self.__x + other, self.__y + other)
 
+    __radd__ = __add__
+
     def __sub__(self, other: Vector | int | float) -> Vector:
-        return self + (-other)
+        if isinstance(other, Vector):
+            return Vector(self.__x - other.__x, self.__y - other.__y)
+        else:
+            return Vector(self.__x - other, self.__y - other)
 
     def __eq__(self, other: Vector) -> bool:
-        return self.__x == other.__x and self.__y == other.y
+        return self.__x == other.__x and self.__y == other.__y
 
     def __ne__(self, other: Vector) -> bool:
         return not self == other
@@ -54,28 +65,40 @@ class Vector:
         return self.__x * other.__x + other.__y * self.__y
 
     def length2(self) -> int | float:
-        return self.__x ** 2 + self.__y ** 2
+        return self.__x * self.__x + self.__y * self.__y
 
     def length(self) -> float:
         return sqrt(self.length2())
 
     def distance2(self, other: Vector) -> int | float:
-        return (self - other).length2()
+        dx, dy = self.__x - other.__x, self.__y - other.__y
+        return dx * dx + dy * dy
+
+    def distance2_xy(self, x: int | float, y: int | float) -> int | float:
+        """
+        Squared distance to point given by raw coordinates
+        """
+        dx, dy = self.__x - x, self.__y - y
+        return dx * dx + dy * dy
 
     def distance(self, other: Vector) -> float:
         return sqrt(self.distance2(other))
 
     def normalize(self):
-        return self / self.length()
+        length = self.length()
+        return self / length if length else self
 
     def set_length(self, length: int | float) -> Vector:
-        return self.normalize() * length
+        norm = self.length()
+        if not norm:
+            return self * length
+        return Vector(self.__x / norm * length, self.__y / norm * length)
 
     def project(self, to: Vector):
         return to * self.dot(to) / to.length2()
 
     def is_zero(self) -> bool:
-        return self == Vector()
+        return self.__x == 0 and self.__y == 0
 
     def hsymm(self, x: int | float = 0) -> Vector:
         return Vector(2 * x - self.__x, self.__y)
@@ -101,7 +124,7 @@ class Vector:
         Coord in range radius
         :param r: Radius
         """
-        return self.length2() <= r ** 2
+        return self.__x * self.__x + self.__y * self.__y <= r * r
 
     def in_range2(self, ri: int, ro: int) -> bool:
         """
@@ -117,7 +140,18 @@ class Vector:
         :param other: Center of circle
         :param r: Radius of circle
         """
-        return (other - self).in_range(r)
+        dx, dy = other.__x - self.__x, other.__y - self.__y
+        return dx * dx + dy * dy <= r * r
+
+    def in_range_xy(self, x: int | float, y: int | float, r: int) -> bool:
+        """
+        Coord in range circle given by raw coordinates
+        :param x: X of center of circle
+        :param y: Y of center of circle
+        :param r: Radius of circle
+        """
+        dx, dy = x - self.__x, y - self.__y
+        return dx * dx + dy * dy <= r * r
 
     def in_range_vec2(self, other: Vector, ri: int, ro: int) -> bool:
         """
@@ -135,18 +169,59 @@ class Vector:
         :return: List of closest coords
         """
         closest, min_dist = [], 0
+        x, y = self.__x, self.__y
 
         for coord in coords:
-            dist = self.distance2(coord)
+            dx, dy = x - coord.__x, y - coord.__y
+            dist = dx * dx + dy * dy
             if not closest or dist < min_dist:
                 closest, min_dist = [coord], dist
-            else:
+            elif dist == min_dist:
                 closest.append(coord)
 
         return closest
 
+    def get_closest_in_range(self, coords: Iterable[Vector], r: int) -> list[Vector]:
+        """
+        Get closest coords with equal distance inside circle around self, one pass without temporary vectors
+        :param coords: Coords
+        :param r: Radius of circle
+        :return: List of closest coords
+        """
+        closest, min_dist, r2 = [], 0, r * r
+        x, y = self.__x, self.__y
+
+        for coord in coords:
+            dx, dy = x - coord.__x, y - coord.__y
+            dist = dx * dx + dy * dy
+            if dist > r2:
+                continue
+            if not closest or dist < min_dist:
+                closest, min_dist = [coord], dist
+            elif dist == min_dist:
+                closest.append(coord)
+
+        return closest
+
+    @staticmethod
+    def mean(coords: list[Vector]) -> Vector:
+        """
+        Mean of coords
+        :param coords: Not empty list of coords
+        """
+        x, y = 0, 0
+        for coord in coords:
+            x += coord.__x
+            y += coord.__y
+        return Vector(x / len(coords), y / len(coords))
+
 
 class RectangleRange:
+    """
+    Immutable rectangle with inclusive bounds
+    """
+    __slots__ = ('__from', '__to')
+
     __from: Vector
     __to: Vector
 
@@ -188,7 +263,13 @@ class RectangleRange:
         """
         Point inside rectangle
         """
-        return self.__from.x <= coord.x <= self.__to.x and self.__from.y <= coord.y <= self.__to.y
+        return self.in_range_xy(coord.x, coord.y)
+
+    def in_range_xy(self, x: int | float, y: int | float) -> bool:
+        """
+        Point given by raw coordinates inside rectangle
+        """
+        return self.__from.x <= x <= self.__to.x and self.__from.y <= y <= self.__to.y
 
     def intersect(self, rectangle: RectangleRange) -> RectangleRange:
         """
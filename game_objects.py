@@ -1,21 +1,32 @@
+from __future__ import annotations
 from enum import Enum
 
 import properties
+from fish_types import FishColor, FishKind
 from game_math import Vector, RectangleRange
+from scan_mask import ScoreTable
 
 
-class FishColor(Enum):
-    UGLY, PINK, YELLOW, GREEN, BLUE = range(-1, 4)
+class FishMeta:
+    """
+    Constant data of fish, one instance is shared by all snapshots of the fish
+    """
+    __slots__ = ('fish_id', 'color', 'kind')
 
+    fish_id: int
+    color: FishColor
+    kind: FishKind
 
-class FishKind(Enum):
-    ANGLER, JELLY, FISH, CRAB = range(-1, 3)
+    def __init__(self, fish_id: int, color: FishColor, kind: FishKind):
+        self.fish_id = fish_id
+        self.color = color
+        self.kind = kind
 
 
 class Fish:
-    __fish_id: int
-    __color: FishColor
-    __kind: FishKind
+    __slots__ = ('__meta', 'position', 'speed', 'location', 'last_seen')
+
+    __meta: FishMeta
     position: Vector
     speed: Vector | None
     location: RectangleRange
@@ -23,27 +34,38 @@ class Fish:
 
     @property
     def fish_id(self):
-        return self.__fish_id
+        return self.__meta.fish_id
 
     @property
     def color(self):
-        return self.__color
+        return self.__meta.color
 
     @property
     def kind(self):
-        return self.__kind
+        return self.__meta.kind
 
     def __init__(self, fish_id: int, color: FishColor = FishColor.UGLY, kind: FishKind = FishKind.ANGLER):
-        self.__fish_id = fish_id
-        self.__color = color
-        self.__kind = kind
+        self.__meta = FishMeta(fish_id, color, kind)
         self.position = Vector()
         self.speed = None
         self.location = RectangleRange(Vector(), Vector())
         self.last_seen = properties.MAX_TURN
 
+    def fork(self) -> Fish:
+        """
+        Copy of fish.
+        Metadata and values (Vector, RectangleRange are immutable) are shared by reference
+        """
+        fish = Fish.__new__(Fish)
+        fish.__meta = self.__meta
+        fish.position = self.position
+        fish.speed = self.speed
+        fish.location = self.location
+        fish.last_seen = self.last_seen
+        return fish
+
     def __str__(self):
-        s = f"[{self.__fish_id}] {self.__color.name} {self.__kind.name} {self.position}"
+        s = f"[{self.fish_id}] {self.color.name} {self.kind.name} {self.position}"
         if self.speed is not None:
             s += f" V {int(self.speed.length())} {self.speed}"
         return s
@@ -54,6 +76,12 @@ class BlipType(Enum):
 
 
 class Drone:
+    __slots__ = ('__drone_id', '__player_id', 'position', 'speed', 'emergency', 'battery', 'light_radius', 'lighting',
+                 'motor_on', 'scans', 'new_scans', 'radar_blips')
+
+    # Radar blips are stored by fish id, default size is for ids of the game rules
+    BLIPS = 32
+
     __drone_id: int
     __player_id: int
     position: Vector
@@ -63,9 +91,9 @@ class Drone:
     light_radius: int
     lighting: bool
     motor_on: bool
-    scans: set[int]
-    new_scans: set[int]
-    radar_blips: dict[int, BlipType]
+    scans: int
+    new_scans: int
+    radar_blips: list[BlipType | None]
 
     @property
     def drone_id(self) -> int:
@@ -75,7 +103,12 @@ class Drone:
     def player_id(self) -> int:
         return self.__player_id
 
-    def __init__(self, drone_id: int, player_id: int):
+    def __init__(self, drone_id: int, player_id: int, blips: int = BLIPS):
+        """
+        :param drone_id: Id of drone
+        :param player_id: Id of owner
+        :param blips: Number of radar blips, greater than the largest fish id
+        """
         self.__drone_id = drone_id
         self.__player_id = player_id
         self.position = Vector()
@@ -85,13 +118,35 @@ class Drone:
         self.light_radius = properties.DARK_SCAN_RADIUS
         self.lighting = False
         self.motor_on = False
-        self.scans = set()
-        self.new_scans = set()
-        self.radar_blips = {}
+        self.scans = 0
+        self.new_scans = 0
+        self.radar_blips = [None] * blips
+
+    def fork(self) -> Drone:
+        """
+        Copy of drone with own radar blips
+        """
+        drone = Drone.__new__(Drone)
+        drone.__drone_id = self.__drone_id
+        drone.__player_id = self.__player_id
+        drone.position = self.position
+        drone.speed = self.speed
+        drone.emergency = self.emergency
+        drone.battery = self.battery
+        drone.light_radius = self.light_radius
+        drone.lighting = self.lighting
+        drone.motor_on = self.motor_on
+        drone.scans = self.scans
+        drone.new_scans = self.new_scans
+        drone.radar_blips = self.radar_blips.copy()
+        return drone
+
+    def clear_blips(self) -> None:
+        self.radar_blips[:] = [None] * len(self.radar_blips)
 
     def __str__(self):
         return f"[{self.__drone_id}] {'My' if self.__player_id == 0 else 'Enemy'} Drone {self.position} \
-         V {int(self.speed.length())} B {self.battery} S {len(self.scans)}{'Broken' if self.emergency else ''}"
+         V {int(self.speed.length())} B {self.battery} S {self.scans.bit_count()}{'Broken' if self.emergency else ''}"
 
     def get_range_by_radar(self, fish_id: int) -> RectangleRange:
         x, y, to_x, to_y = 0, 0, properties.MAP_SIZE - 1, properties.MAP_SIZE - 1
@@ -111,20 +166,56 @@ class Drone:
 
 
 class GameState:
+    __slots__ = ('turn', 'time', 'score', 'scans', 'drones', 'fishes', 'lost_fishes', 'score_table')
+
     turn: int
+    time: float
     score: tuple[int, int]
-    scans: tuple[set[int], set[int]]
+    scans: tuple[int, int]
     drones: dict[int, Drone]
     fishes: dict[int, Fish]
     lost_fishes: dict[int, Fish]
+    score_table: ScoreTable | None
 
     def __init__(self):
         self.turn = 0
+        self.time = 0.0
         self.score = 0, 0
-        self.scans = set(), set()
+        self.scans = 0, 0
         self.drones = {}
         self.fishes = {}
         self.lost_fishes = {}
+        self.score_table = None
+
+    def fork(self) -> GameState:
+        """
+        Snapshot of state for the next turn or simulation, without recursive copy
+        """
+        state = GameState.__new__(GameState)
+        state.turn = self.turn
+        state.time = self.time
+        state.score = self.score
+        state.scans = self.scans
+        state.drones = {drone_id: drone.fork() for drone_id, drone in self.drones.items()}
+        state.fishes = {fish_id: fish.fork() for fish_id, fish in self.fishes.items()}
+        state.lost_fishes = {fish_id: fish.fork() for fish_id, fish in self.lost_fishes.items()}
+        state.score_table = self.score_table
+        return state
+
+    def get_score_table(self) -> ScoreTable:
+        """
+        Score table of the game, it is built once with the initial state and shared by all snapshots.
+        State made by hand gets it on the first call
+        """
+        if self.score_table is None:
+            self.score_table = ScoreTable(list(self.fishes.values()) + list(self.lost_fishes.values()))
+        return self.score_table
+
+    def get_fish_limit(self) -> int:
+        """
+        Number of fish ids: the largest id of swimming and lost fishes plus one
+        """
+        return max(max(self.fishes, default=-1), max(self.lost_fishes, default=-1)) + 1
 
     def get_symmetric_fish(self, fish: Fish) -> Fish:
         return self.fishes.get(fish.fish_id + (1 if fish.fish_id % 2 == 0 else -1))
@@ -0,0 +1,315 @@
+from __future__ import annotations
+import argparse
+import random
+import time
+from collections import deque
+
+import properties
+from belief import Belief
+from bot import Bot
+from decisions import Decision
+from game_input import GameReader
+from game_math import Vector
+from game_objects import GameState, Fish, FishColor, FishKind, Drone
+from referee import Referee
+from search import Search
+from time_manager import TimeManager
+
+# Drones of player 0, drones of player 1 are symmetric
+DRONE_START_X = (2000, 5000)
+
+
+def new_game(seed: int) -> GameState:
+    """
+    Full state of a new game: 12 fishes and 1-3 pairs of uglies, all symmetric about the center of map
+    :param seed: Seed of game
+    """
+    rng = random.Random(seed)
+    state = GameState()
+    state.turn = 1
+
+    fish_id = 4
+    for kind in (FishKind.JELLY, FishKind.FISH, FishKind.CRAB):
+        habitat = properties.HABITAT[kind]
+        for color in range(0, 4, 2):
+            fish = Fish(fish_id, FishColor(color), kind)
+            fish.position = Vector(rng.randrange(1000, properties.MAP_SIZE - 1000),
+                                   rng.randrange(habitat[0] + 1000, habitat[1] - 1000))
+            fish.speed = Vector(rng.uniform(-1, 1), rng.uniform(-1, 1)).set_length(properties.FISH_SPEED).round()
+            sfish = Fish(fish_id + 1, FishColor(color + 1), kind)
+            sfish.position, sfish.speed = fish.position.hsymm(properties.CENTER.x), fish.speed.hsymm()
+            state.fishes[fish.fish_id], state.fishes[sfish.fish_id] = fish, sfish
+            fish_id += 2
+
+    for _ in range(rng.randint(1, 3)):
+        fish = Fish(fish_id)
+        fish.position = Vector(rng.randrange(properties.MAP_SIZE), rng.randrange(properties.MONSTER_MIN_START_Y,
+                                                                                 properties.MAP_SIZE))
+        fish.speed = Vector()
+        sfish = Fish(fish_id + 1)
+        sfish.position, sfish.speed = fish.position.hsymm(properties.CENTER.x), fish.speed
+        state.fishes[fish.fish_id], state.fishes[sfish.fish_id] = fish, sfish
+        fish_id += 2
+
+    for i, x in enumerate(DRONE_START_X):
+        for player_id in range(2):
+            drone = Drone(i * 2 + player_id, player_id, state.get_fish_limit())
+            drone.position = Vector(x if player_id == 0 else properties.MAP_SIZE - 1 - x, properties.SURFACE)
+            state.drones[drone.drone_id] = drone
+
+    state.get_score_table()
+    return state
+
+
+def format_initialize(state: GameState) -> bytes:
+    """
+    Initial input of both players
+    """
+    fishes = sorted(list(state.fishes.values()) + list(state.lost_fishes.values()), key=lambda fish: fish.fish_id)
+    lines = [str(len(fishes))] + [f"{fish.fish_id} {fish.color.value} {fish.kind.value}" for fish in fishes]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def format_turn(state: GameState, player_id: int) -> bytes:
+    """
+    Input of turn for player: everything of player goes first, fishes are visible in light of its drones
+    """
+    players = (player_id, 1 - player_id)
+    my_drones = [drone for drone in state.drones.values() if drone.player_id == player_id]
+    fishes = sorted(state.fishes.values(), key=lambda fish: fish.fish_id)
+
+    lines = [str(state.score[player]) for player in players]
+    for player in players:
+        fish_ids = [str(fish_id) for fish_id in range(state.scans[player].bit_length())
+                    if state.scans[player] >> fish_id & 1]
+        lines += [str(len(fish_ids))] + fish_ids
+    for player in players:
+        drones = [drone for drone in state.drones.values() if drone.player_id == player]
+        lines += [str(len(drones))] + [f"{drone.drone_id} {round(drone.position.x)} {round(drone.position.y)} \
+{int(bool(drone.emergency))} {drone.battery}" for drone in drones]
+
+    scans = [f"{drone.drone_id} {fish_id}" for player in players for drone in state.drones.values()
+             if drone.player_id == player for fish_id in range(drone.scans.bit_length()) if drone.scans >> fish_id & 1]
+    lines += [str(len(scans))] + scans
+
+    visible = [fish for fish in fishes if any(
+        fish.position.in_range_vec(drone.position, drone.light_radius + (
+            properties.MONSTER_DETECTED_RADIUS_ADD if fish.kind == FishKind.ANGLER else 0)) for drone in my_drones)]
+    lines += [str(len(visible))] + [f"{fish.fish_id} {round(fish.position.x)} {round(fish.position.y)} \
+{round(fish.speed.x)} {round(fish.speed.y)}" for fish in visible]
+
+    blips = [f"{drone.drone_id} {fish.fish_id} {'T' if fish.position.y < drone.position.y else 'B'}\
+{'L' if fish.position.x < drone.position.x else 'R'}" for drone in my_drones for fish in fishes]
+    lines += [str(len(blips))] + blips
+
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def parse_actions(text: str, drone_ids: list[int]) -> list[Decision]:
+    """
+    Decisions for one turn from output of player, one line per drone in order of its drones
+    """
+    decisions = []
+    for drone_id, line in zip(drone_ids, text.splitlines()):
+        words = line.split()
+        if words and words[0] == 'MOVE':
+            decisions.append(Decision(drone_id, (int(words[1]), int(words[2])), words[3] == '1'))
+        elif words and words[0] == 'WAIT':
+            decisions.append(Decision(drone_id, None, words[1] == '1'))
+    return decisions
+
+
+class Channel:
+    """
+    In-process pipe: referee writes input of player, reader of player reads it
+    """
+    __chunks: deque[bytes]
+
+    def __init__(self):
+        self.__chunks = deque()
+
+    def write(self, data: bytes) -> None:
+        self.__chunks.append(data)
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.__chunks.popleft() if self.__chunks else b''
+
+    read = read1
+
+
+class Overrides:
+    """
+    Constants of bot classes ('Search.HORIZON': 15) which are replaced while the bot of one player works,
+    so bots with different constants play in one process
+    """
+    CLASSES = {'Bot': Bot, 'Search': Search, 'Belief': Belief, 'TimeManager': TimeManager}
+
+    values: dict[str, object]
+    __saved: list[tuple[type, str, object]]
+
+    def __init__(self, values: dict[str, object] = None):
+        self.values = values or {}
+        self.__saved = []
+        for name in self.values:
+            class_name, _, attribute = name.partition('.')
+            if not hasattr(Overrides.CLASSES.get(class_name), attribute):
+                raise ValueError(f"Unknown constant {name}")
+
+    def __enter__(self) -> Overrides:
+        for name, value in self.values.items():
+            class_name, _, attribute = name.partition('.')
+            cls = Overrides.CLASSES[class_name]
+            self.__saved.append((cls, attribute, getattr(cls, attribute)))
+            setattr(cls, attribute, value)
+        return self
+
+    def __exit__(self, *args) -> None:
+        while self.__saved:
+            cls, attribute, value = self.__saved.pop()
+            setattr(cls, attribute, value)
+
+
+class BotPlayer:
+    """
+    Bot which plays through the protocol without stdin and stdout
+    """
+    player_id: int
+    channel: Channel
+    reader: GameReader
+    overrides: Overrides
+    bot: Bot
+    times: list[float]
+
+    def __init__(self, player_id: int, initialize: bytes, first_turn_time: float, turn_time: float,
+                 overrides: Overrides = None, seed: int = None):
+        """
+        :param player_id: Player of the referee
+        :param initialize: Initial input
+        :param first_turn_time: Time for response on the first turn
+        :param turn_time: Time for response on other turns
+        :param overrides: Constants of this bot
+        :param seed: Seed of the bot
+        """
+        self.player_id = player_id
+        self.channel = Channel()
+        self.reader = GameReader(self.channel)
+        self.overrides = overrides or Overrides()
+        self.channel.write(initialize)
+        with self.overrides:
+            self.bot = Bot(self.reader.read_initialize(), first_turn_time, turn_time, seed)
+        self.times = []
+
+    def play(self, data: bytes) -> str:
+        """
+        Output of bot for input of turn
+        """
+        start = time.perf_counter()
+        with self.overrides:
+            self.channel.write(data)
+            self.bot.state = self.reader.read_state(self.bot.state)
+            action = str(self.bot.get_action())
+            self.bot.end_turn()
+        self.times.append(time.perf_counter() - start)
+        return action
+
+
+class MatchResult:
+    seed: int
+    score: tuple[int, int]
+    turns: int
+    time: float
+    turn_times: tuple[float, float]
+    max_turn_times: tuple[float, float]
+
+    def __init__(self, seed: int, score: tuple[int, int], turns: int, time: float,
+                 turn_times: tuple[float, float] = (0, 0), max_turn_times: tuple[float, float] = (0, 0)):
+        """
+        :param seed: Seed of game
+        :param score: Final score of players
+        :param turns: Number of played turns
+        :param time: Time of game
+        :param turn_times: Mean response time of players
+        :param max_turn_times: Max response time of players (the first turn is not counted)
+        """
+        self.seed = seed
+        self.score = score
+        self.turns = turns
+        self.time = time
+        self.turn_times = turn_times
+        self.max_turn_times = max_turn_times
+
+    @property
+    def winner(self) -> int | None:
+        """
+        Winner player, None is draw
+        """
+        if self.score[0] == self.score[1]:
+            return None
+        return 0 if self.score[0] > self.score[1] else 1
+
+    def __str__(self):
+        return f"Seed {self.seed}: {self.score[0]} - {self.score[1]} in {self.turns} turns, {self.time:.1f} s"
+
+
+def play_match(seed: int, first_turn_time: float = properties.FIRST_TURN_TIME,
+               turn_time: float = properties.TURN_TIME,
+               overrides: tuple[Overrides | None, Overrides | None] = (None, None)) -> MatchResult:
+    """
+    Two bots play one game against each other
+    :param seed: Seed of game
+    :param first_turn_time: Time of bots for the first turn
+    :param turn_time: Time of bots for other turns
+    :param overrides: Constants of bots of players
+    """
+    start = time.perf_counter()
+    state = new_game(seed)
+    referee = Referee(state, True)
+
+    initialize = format_initialize(state)
+    # bots get their own seeds of the game, so the game is repeated by its seed as far as time allows
+    players = [BotPlayer(player_id, initialize, first_turn_time, turn_time, overrides[player_id], seed * 2 + player_id)
+               for player_id in range(2)]
+
+    turns = 0
+    while not referee.is_game_over():
+        decisions = []
+        for player in players:
+            drone_ids = [drone.drone_id for drone in state.drones.values() if drone.player_id == player.player_id]
+            decisions += parse_actions(player.play(format_turn(state, player.player_id)), drone_ids)
+
+        referee.remove_to_lost()
+        referee.update_drone(decisions)
+        referee.update_positions()
+        referee.update_speed()
+        referee.do_scan()
+        referee.do_report()
+        state.turn += 1
+        turns += 1
+
+    # in end of the game, save all scanned fish
+    referee.do_report(True)
+
+    return MatchResult(seed, state.score, turns, time.perf_counter() - start,
+                       tuple(sum(player.times) / max(len(player.times), 1) for player in players),
+                       tuple(max(player.times[1:], default=0) for player in players))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless matches of the bot against itself")
+    parser.add_argument('--games', type=int, default=10, help="Number of games")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the first game")
+    parser.add_argument('--turn-time', type=float, default=properties.TURN_TIME, help="Bot time per turn")
+    parser.add_argument('--first-turn-time', type=float, default=properties.FIRST_TURN_TIME,
+                        help="Bot time for the first turn")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    wins = [0, 0]
+    for game_seed in range(args.seed, args.seed + args.games):
+        result = play_match(game_seed, args.first_turn_time, args.turn_time)
+        print(result)
+        if result.winner is not None:
+            wins[result.winner] += 1
+
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games, wins {wins[0]} - {wins[1]}, {args.games / elapsed * 3600:.0f} games per hour")
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from decisions import Decision
+from game_objects import GameState
+from referee import Referee
+from vector_referee import VectorReferee
+
+
+class ParallelEvaluator:
+    """
+    Evaluates plans by rollouts on a process pool, for offline analysis and tuning.
+    Root state is serialized once and sent to every worker at its start, tasks carry only plans
+    """
+    worker_state: GameState | None = None
+
+    __executor: ProcessPoolExecutor
+    __workers: int
+    __batch: bool
+
+    def __init__(self, state: GameState, workers: int = None, batch: bool = True):
+        """
+        :param state: Root state for all rollouts
+        :param workers: Number of processes, default is number of cores
+        :param batch: Worker simulates its chunk in lockstep by VectorReferee, else by Referee one by one
+        """
+        root = state.fork()
+        root.score_table = None  # cheaper to rebuild in worker than to send
+
+        self.__workers = workers or os.cpu_count() or 1
+        self.__batch = batch
+        self.__executor = ProcessPoolExecutor(self.__workers, initializer=ParallelEvaluator.init_worker,
+                                              initargs=(pickle.dumps(root, pickle.HIGHEST_PROTOCOL),))
+
+    def __enter__(self) -> ParallelEvaluator:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.__executor.shutdown()
+
+    @staticmethod
+    def init_worker(payload: bytes) -> None:
+        ParallelEvaluator.worker_state = pickle.loads(payload)
+        ParallelEvaluator.worker_state.get_score_table()
+
+    @staticmethod
+    def encode(plan: list[Decision]) -> list[tuple]:
+        """
+        Compact form of plan for task
+        """
+        return [(d.drone_id, d.position, d.light, d.turns) for d in plan]
+
+    @staticmethod
+    def evaluate_chunk(plans: list[list[tuple]], depth: int | None, batch: bool) -> list[int]:
+        """
+        Worker task: simulate chunk of plans from the worker root state
+        """
+        plans = [[Decision(*decision) for decision in plan] for plan in plans]
+        if batch:
+            return VectorReferee.simulate_batch(ParallelEvaluator.worker_state, plans, depth).tolist()
+        return [Referee.simulate(ParallelEvaluator.worker_state, plan, depth) for plan in plans]
+
+    def evaluate(self, decisions: list[list[Decision]], depth: int = None) -> np.ndarray:
+        """
+        Simulate all plans, chunks are distributed over workers
+        :param decisions: List of plans
+        :param depth: Number of turns to simulate, default is until end of game
+        :return: Array of player score differences, one per plan
+        """
+        plans = [ParallelEvaluator.encode(plan) for plan in decisions]
+        size = -(-len(plans) // self.__workers)
+        futures = [self.__executor.submit(ParallelEvaluator.evaluate_chunk, plans[i:i + size], depth, self.__batch)
+                   for i in range(0, len(plans), size)]
+        return np.array([score for future in futures for score in future.result()], dtype=np.int64)
+
+    def get_best(self, decisions: list[list[Decision]], depth: int = None) -> tuple[int, list[Decision]]:
+        """
+        The best plan
+        :return: Score difference and plan
+        """
+        scores = self.evaluate(decisions, depth)
+        best = int(np.argmax(scores))
+        return int(scores[best]), decisions[best]
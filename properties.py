@@ -1,9 +1,11 @@
 from typing import Final
 
 from game_math import Vector
-from game_objects import FishKind
+from fish_types import FishKind
 
 MAX_TURN: Final = 200
+FIRST_TURN_TIME: Final = 1.0
+TURN_TIME: Final = 0.05
 
 MAP_SIZE: Final = 10000
 SURFACE: Final = 500
@@ -1,16 +1,46 @@
-import copy
+from math import ceil, sqrt
 
 import properties
 from decisions import Decision
 from game_math import Vector
-from game_objects import GameState, Fish, FishKind
+from game_objects import GameState, Fish, FishKind, Drone
+from scan_mask import fish_bit
+from spatial_index import SpatialGrid
+from telemetry import telemetry
 
 
 class Referee:
     state: GameState
+    fish_index: tuple[SpatialGrid, SpatialGrid] | None
+    quiet: dict[int, int] | None
 
-    def __init__(self, state: GameState):
+    def __init__(self, state: GameState, indexed: bool = False, events: bool = False):
+        """
+        :param state: State for update
+        :param indexed: Keep spatial index of fishes up to date between turns.
+        Then fishes must be moved only by the referee
+        :param events: Fast-forward free-moving fishes: their speed is not updated until the next event
+        (border, drone or other fish in range). Then fishes must be moved only by the referee
+        """
         self.state = state
+        self.fish_index = self.build_fish_index() if indexed else None
+        self.quiet = {} if events else None
+
+    def build_fish_index(self) -> tuple[SpatialGrid, SpatialGrid]:
+        """
+        Spatial indexes of swimming fishes with defined speed
+        :return: Index of other fishes and index of ugly
+        """
+        fishes = [fish for fish in self.state.fishes.values() if fish.speed is not None]
+        return (SpatialGrid.build((fish.fish_id, fish.position) for fish in fishes if fish.kind != FishKind.ANGLER),
+                SpatialGrid.build((fish.fish_id, fish.position) for fish in fishes if fish.kind == FishKind.ANGLER))
+
+    def get_fish_neighbours(self, fish: Fish, r: int) -> list[Vector]:
+        """
+        Closest positions of other fishes of the same type (ugly or not) within radius
+        """
+        index = self.fish_index if self.fish_index is not None else self.build_fish_index()
+        return index[fish.kind == FishKind.ANGLER].get_closest(fish.position, r, fish.fish_id)
 
     @staticmethod
     def snap_to_fish_zone(kind: FishKind, position: Vector) -> Vector:
@@ -41,7 +71,12 @@ class Referee:
 
         for fish in fishes:
             if fish.speed is not None:
-                fish.position = Referee.snap_to_fish_zone(fish.kind, fish.position + fish.speed)
+                if self.quiet is not None and self.quiet.get(fish.fish_id, -1) >= self.state.turn:  # far from borders
+                    fish.position = fish.position + fish.speed
+                else:
+                    fish.position = Referee.snap_to_fish_zone(fish.kind, fish.position + fish.speed)
+                if self.fish_index is not None:
+                    self.fish_index[fish.kind == FishKind.ANGLER].update(fish.fish_id, fish.position)
 
     def update_speed(self, fishes: list[Fish] = None) -> None:
         """
@@ -52,9 +87,103 @@ class Referee:
         if fishes is None:
             fishes = self.state.fishes.values()
 
+        # positions don't change here, so temporary index is valid for all fishes
+        indexed = self.fish_index is not None
+        if not indexed:
+            self.fish_index = self.build_fish_index()
+
+        surroundings = None
         for fish in fishes:
-            if fish.speed is not None:
+            if fish.speed is None:
+                continue
+            if self.quiet is None:
                 fish.speed = self.get_fish_speed(fish)
+                continue
+
+            # free-moving fish keeps its speed until border or until something comes in range
+            if surroundings is None:
+                surroundings = self.get_active_drones(), self.get_crowded_fishes()
+            if self.quiet.get(fish.fish_id, -1) >= self.state.turn and not self.is_disturbed(fish, *surroundings):
+                continue
+            speed, fish.speed = fish.speed, self.get_fish_speed(fish)
+            self.quiet[fish.fish_id] = self.state.turn + self.get_quiet_turns(fish) if speed == fish.speed else -1
+
+        if not indexed:
+            self.fish_index = None
+
+    def get_active_drones(self) -> list[tuple[float, float, int]]:
+        """
+        Coordinates of active drones with light radius
+        """
+        return [(drone.position.x, drone.position.y, drone.light_radius) for drone in self.state.drones.values()
+                if not drone.emergency]
+
+    def get_crowded_fishes(self) -> set[int]:
+        """
+        Ids of swimming fishes with defined speed which have other fish of the same type (ugly or not) in range.
+        Fishes are swept in order of x, so only pairs closer than range by x are compared
+        """
+        crowded = set()
+        for ugly, radius in ((False, properties.MIN_DISTANCE_BT_FISH), (True, properties.MIN_DISTANCE_BT_MONSTER)):
+            fishes = sorted((fish.position.x, fish.position.y, fish.fish_id) for fish in self.state.fishes.values()
+                            if fish.speed is not None and (fish.kind == FishKind.ANGLER) == ugly)
+            radius2 = radius * radius
+            for i, (x, y, fish_id) in enumerate(fishes):
+                for j in range(i + 1, len(fishes)):
+                    other_x, other_y, other_id = fishes[j]
+                    dx, dy = other_x - x, other_y - y
+                    if dx > radius:
+                        break
+                    if dx * dx + dy * dy <= radius2:
+                        crowded.add(fish_id)
+                        crowded.add(other_id)
+        return crowded
+
+    @staticmethod
+    def is_disturbed(fish: Fish, drones: list[tuple[float, float, int]], crowded: set[int]) -> bool:
+        """
+        Drone or other fish of the same type is in range, so speed of fish may change (as in get_fish_speed)
+        :param drones: Drones of get_active_drones
+        :param crowded: Fishes of get_crowded_fishes
+        """
+        x, y = fish.position.x, fish.position.y
+        ugly = fish.kind == FishKind.ANGLER
+        for drone_x, drone_y, light_radius in drones:
+            dx, dy = drone_x - x, drone_y - y
+            radius = light_radius if ugly else properties.MOTOR_RANGE
+            if dx * dx + dy * dy <= radius * radius:
+                return True
+        return fish.fish_id in crowded
+
+    @staticmethod
+    def get_quiet_turns(fish: Fish) -> int:
+        """
+        Number of the next speed updates which keep speed of fish while it is not disturbed:
+        speed is stable for free movement and the fish does not reach border
+        """
+        speed = fish.speed
+        if fish.kind == FishKind.ANGLER:
+            if speed.length() > properties.MONSTER_SPEED \
+                    and speed.set_length(properties.MONSTER_SPEED).round() != speed:
+                return 0
+            checked = speed
+        else:
+            checked = speed.set_length(properties.FISH_SPEED)  # border is checked before rounding
+            if checked.epsilon_round().round() != speed:
+                return 0
+
+        # position after j moves plus the checked speed stays in habitat
+        turns = properties.MAX_TURN
+        habitat = properties.HABITAT[fish.kind]
+        for coord, delta, check, low, high in (
+                (fish.position.x, speed.x, checked.x, 0, properties.MAP_SIZE - 1),
+                (fish.position.y, speed.y, checked.y, habitat[0], habitat[1])):
+            if delta > 0:
+                turns = min(turns, ceil((high - coord - check) / delta) - 1)
+            elif delta < 0:
+                turns = min(turns, ceil((coord + check - low) / -delta) - 1)
+
+        return max(turns, 0)
 
     def get_ugly_speed(self, fish: Fish) -> Vector:
         """
@@ -65,16 +194,13 @@ class Referee:
             [drone.position for drone in self.state.drones.values()
              if not drone.emergency and fish.position.in_range_vec(drone.position, drone.light_radius)])
         if drone_positions:
-            pos = sum(drone_positions) / len(drone_positions)
-            speed = (fish.position - pos).set_length(properties.MONSTER_ATTACK_SPEED).round()
+            pos = Vector.mean(drone_positions)
+            speed = (pos - fish.position).set_length(properties.MONSTER_ATTACK_SPEED).round()
         else:
             # Near other ugly
-            fish_positions = fish.position.get_closest(
-                [f.position for f in self.state.fishes.values()
-                 if f.speed is not None and f.fish_id != fish.fish_id and f.kind == FishKind.ANGLER and
-                 fish.position.in_range_vec(f.position, properties.MIN_DISTANCE_BT_MONSTER)])
+            fish_positions = self.get_fish_neighbours(fish, properties.MIN_DISTANCE_BT_MONSTER)
             if fish_positions:
-                pos = sum(fish_positions) / len(fish_positions)
+                pos = Vector.mean(fish_positions)
                 # set_length(MONSTER_SPEED) but must repeat error from official referee
                 speed = (fish.position - pos).set_length(properties.FISH_SPEED).round()
             elif fish.speed.length() > properties.MONSTER_SPEED:
@@ -83,12 +209,12 @@ class Referee:
                 speed = fish.speed
 
             # Border
-            next_position = fish.position + speed
+            next_x, next_y = fish.position.x + speed.x, fish.position.y + speed.y
 
             habitat = properties.HABITAT[FishKind.ANGLER]
-            if next_position.x < 0 or next_position.x > properties.MAP_SIZE - 1:
+            if next_x < 0 or next_x > properties.MAP_SIZE - 1:
                 speed = speed.hsymm()
-            if next_position.y < habitat[0] or next_position.y > habitat[1]:
+            if next_y < habitat[0] or next_y > habitat[1]:
                 speed = speed.vsymm()
 
         return speed
@@ -103,31 +229,28 @@ class Referee:
             return self.get_ugly_speed(fish)
 
         # Near drone
-        drone_positions = fish.position.get_closest(
-            [drone.position for drone in self.state.drones.values()
-             if not drone.emergency and fish.position.in_range_vec(drone.position, properties.MOTOR_RANGE)])
+        drone_positions = fish.position.get_closest_in_range(
+            (drone.position for drone in self.state.drones.values() if not drone.emergency),
+            properties.MOTOR_RANGE)
         if drone_positions:
-            pos = sum(drone_positions) / len(drone_positions)
+            pos = Vector.mean(drone_positions)
             speed = (fish.position - pos).set_length(properties.FISH_FRIGHTENED_SPEED).round()
         else:
             # Near fish
-            fish_positions = fish.position.get_closest(
-                [f.position for f in self.state.fishes.values()
-                 if f.speed is not None and f.fish_id != fish.fish_id and f.kind != FishKind.ANGLER and
-                 fish.position.in_range_vec(f.position, properties.MIN_DISTANCE_BT_FISH)])
+            fish_positions = self.get_fish_neighbours(fish, properties.MIN_DISTANCE_BT_FISH)
             if fish_positions:
-                pos = sum(fish_positions) / len(fish_positions)
+                pos = Vector.mean(fish_positions)
                 speed = (fish.position - pos).set_length(properties.FISH_SPEED)
             else:
                 speed = fish.speed.set_length(properties.FISH_SPEED)
 
             # Border
-            next_position = fish.position + speed
+            next_x, next_y = fish.position.x + speed.x, fish.position.y + speed.y
 
             habitat = properties.HABITAT[fish.kind]
-            if next_position.x < 0 or next_position.x > properties.MAP_SIZE - 1:
+            if next_x < 0 or next_x > properties.MAP_SIZE - 1:
                 speed = speed.hsymm()
-            if next_position.y < habitat[0] or next_position.y > habitat[1]:
+            if next_y < habitat[0] or next_y > habitat[1]:
                 speed = speed.vsymm()
 
             speed = speed.epsilon_round().round()
@@ -140,42 +263,47 @@ class Referee:
         """
         fishes = [fish for fish in self.state.fishes.values() if fish.kind != FishKind.ANGLER]
         for fish in fishes:
-            new_position = fish.position + fish.speed
-            if new_position.x < 0 or new_position.x > properties.MAP_SIZE - 1:
+            new_x = fish.position.x + fish.speed.x
+            if new_x < 0 or new_x > properties.MAP_SIZE - 1:
                 self.state.lost_fishes[fish.fish_id] = self.state.fishes.pop(fish.fish_id)
+                if self.fish_index is not None:
+                    self.fish_index[False].remove(fish.fish_id)
 
     def do_scan(self) -> None:
         """
         Scan fish with drones within the lighting radius
         """
         for drone in (drone for drone in self.state.drones.values() if not drone.emergency):
-            fishes = (fish for fish in self.state.fishes.values() if fish.fish_id not in drone.scans
-                      and fish.fish_id not in self.state.scans[drone.player_id]
-                      and fish.position.in_range_vec(drone.position, drone.light_radius))
-            for fish in fishes:
-                drone.scans.add(fish.fish_id)
+            known = drone.scans | self.state.scans[drone.player_id]
+            for fish in self.state.fishes.values():
+                if fish.kind != FishKind.ANGLER and not known >> fish.fish_id & 1 \
+                        and fish.position.in_range_vec(drone.position, drone.light_radius):
+                    drone.scans |= fish_bit(fish.fish_id)
 
     def do_report(self, end: bool = False) -> None:
         """
         Save fish on a surface
         :param end: Save fish anywhere
         """
-        scans = set(), set()
+        scans = [0, 0]
 
         # get union scans
         for drone in self.state.drones.values():
             if drone.position.y <= properties.SURFACE or end:
                 scans[drone.player_id] |= drone.scans
-                drone.scans.clear()
+                drone.scans = 0
+        if not scans[0] and not scans[1]:
+            return
+
         # remove already scanned fish
-        scans[0] -= self.state.scans[0]
-        scans[1] -= self.state.scans[1]
+        scans[0] &= ~self.state.scans[0]
+        scans[1] &= ~self.state.scans[1]
 
         # determinate first scan (not in enemy drone scans and saved scans)
-        scans_bonus = (scans[0] - scans[1] - self.state.scans[1],
-                       scans[1] - scans[0] - self.state.scans[0])
-        scans[0] -= scans_bonus[0]
-        scans[1] -= scans_bonus[1]
+        scans_bonus = (scans[0] & ~scans[1] & ~self.state.scans[1],
+                       scans[1] & ~scans[0] & ~self.state.scans[0])
+        scans[0] &= ~scans_bonus[0]
+        scans[1] &= ~scans_bonus[1]
 
         # apply scans
         self.apply_scans(0, scans[0])
@@ -183,36 +311,25 @@ class Referee:
         self.apply_scans(0, scans_bonus[0], True)
         self.apply_scans(1, scans_bonus[1], True)
 
-    def apply_scans(self, player_id: int, scans: set[int], bonus: bool = False):
+    def apply_scans(self, player_id: int, scans: int, bonus: bool = False):
         """
         Apply scans to state scans and increase score
         :param player_id: Apply for player
-        :param scans: Set of fish id
+        :param scans: Mask of fish ids
         :param bonus: It is first scan with bonus
         """
-        fishes = map(self.state.get_fish, scans)
+        if not scans:
+            return
 
-        for fish in fishes:
-            self.state.scans[player_id].add(fish.fish_id)
-            self.state.score[player_id] += properties.REWARDS[fish.kind]
-            if bonus:
-                self.state.score[player_id] += properties.REWARDS[fish.kind]
-
-        colors = set(fish.color for fish in fishes)
-        kinds = set(fish.kind for fish in fishes)
-        fishes = map(self.state.get_fish, self.state.scans[player_id])
-
-        for color in colors:
-            if len([fish for fish in fishes if fish.color == color]) == 4:
-                self.state.score[player_id] += properties.REWARDS_COLOR
-                if bonus:
-                    self.state.score[player_id] += properties.REWARDS_COLOR
-
-        for kind in kinds:
-            if len([fish for fish in fishes if fish.kind == kind]) == 3:
-                self.state.score[player_id] += properties.REWARDS_KIND
-                if bonus:
-                    self.state.score[player_id] += properties.REWARDS_KIND
+        saved = self.state.scans[player_id]
+        score = self.state.score[player_id] + self.state.get_score_table().get_score(saved, scans, bonus)
+
+        if player_id == 0:
+            self.state.scans = saved | scans, self.state.scans[1]
+            self.state.score = score, self.state.score[1]
+        else:
+            self.state.scans = self.state.scans[0], saved | scans
+            self.state.score = self.state.score[0], score
 
     def is_game_over(self) -> bool:
         """
@@ -225,44 +342,162 @@ class Referee:
             if drone.scans:
                 return False
 
-        fishes = set(fish.fish_id for fish in self.state.fishes.values() if fish.kind != FishKind.ANGLER)
-        if fishes <= self.state.scans[0] and fishes <= self.state.scans[1]:
+        fishes = 0
+        for fish in self.state.fishes.values():
+            if fish.kind != FishKind.ANGLER:
+                fishes |= fish_bit(fish.fish_id)
+        return not fishes & ~(self.state.scans[0] & self.state.scans[1])
+
+    def get_score_bounds(self, turns: int = None) -> tuple[int, int]:
+        """
+        Bounds of player score difference which can be reached until the end of the game:
+        every player can save its drone scans and all reachable fishes with all bonuses, or nothing more
+        :param turns: Number of turns left, then only fishes within reach of drones of player can be scanned.
+        Default is until end of game
+        :return: Min and max difference
+        """
+        if turns is None:
+            turns = properties.MAX_TURN - self.state.turn + 1
+        turns = min(turns, properties.MAX_TURN - self.state.turn + 1)
+        # speeds are rounded, so 1 more per turn for drone and for fish
+        reach = turns * (properties.DRONE_MAX_SPEED + properties.FISH_FRIGHTENED_SPEED + 2) + properties.LIGHT_SCAN_RADIUS
+
+        scans = [0, 0]
+        for drone in self.state.drones.values():
+            scans[drone.player_id] |= drone.scans
+            for fish in self.state.fishes.values():
+                if fish.kind != FishKind.ANGLER and fish.position.in_range_vec(drone.position, reach):
+                    scans[drone.player_id] |= fish_bit(fish.fish_id)
+
+        table = self.state.get_score_table()
+        saved = self.state.scans
+        gains = [table.get_max_score(saved[player_id], scans[player_id], ~saved[1 - player_id])
+                 for player_id in range(2)]
+        difference = self.state.score[0] - self.state.score[1]
+        return difference - gains[1], difference + gains[0]
+
+    @staticmethod
+    def is_collision(drone: Drone, fish: Fish) -> bool:
+        """
+        Ugly catches drone during the turn: both move by their speed from the current positions
+        """
+        x, y = fish.position.x - drone.position.x, fish.position.y - drone.position.y
+        r2 = properties.MONSTER_ATTACK_RADIUS * properties.MONSTER_ATTACK_RADIUS
+
+        # Already in range
+        if x * x + y * y <= r2:
             return True
 
-        return False
+        # Relative motion, solve |(x, y) + t * (vx, vy)| = radius for 0 < t <= 1
+        vx, vy = fish.speed.x - drone.speed.x, fish.speed.y - drone.speed.y
+        a = vx * vx + vy * vy
+        if a <= 0:
+            return False
+        b = 2 * (x * vx + y * vy)
+        delta = b * b - 4 * a * (x * x + y * y - r2)
+        if delta < 0:
+            return False
+        t = (-b - sqrt(delta)) / (2 * a)
+        return 0 < t <= 1
 
     def update_drone(self, decisions: list[Decision]) -> None:
         """
-        Update drone position
-        :param decisions: List of decisions on how to move drones
+        Update drone light, battery, speed and position
+        :param decisions: Decisions for this turn, one per drone. Drone without decision goes to the surface
+        """
+        decisions = {decision.drone_id: decision for decision in decisions}
+        uglies = [fish for fish in self.state.fishes.values() if fish.kind == FishKind.ANGLER]
+
+        for drone in self.state.drones.values():
+            decision = decisions.get(drone.drone_id)
+
+            # Light
+            drone.lighting = decision is not None and decision.light and not drone.emergency \
+                and drone.battery >= properties.BATTERY_DRAIN
+            if drone.lighting:
+                drone.battery -= properties.BATTERY_DRAIN
+                drone.light_radius = properties.LIGHT_SCAN_RADIUS
+            else:
+                drone.battery = min(drone.battery + properties.BATTERY_RECHARGE, properties.MAX_BATTERY)
+                drone.light_radius = properties.DARK_SCAN_RADIUS
+
+            # Speed
+            drone.speed = Referee.get_drone_speed(drone, decision)
+            drone.motor_on = not drone.emergency and (decision is None or decision.position is not None)
+
+            # Ugly attack, drone loses its scans
+            if not drone.emergency and any(Referee.is_collision(drone, fish) for fish in uglies):
+                drone.emergency = True
+                drone.scans = 0
+
+            # Position
+            drone.position = Vector(min(max(drone.position.x + drone.speed.x, 0), properties.MAP_SIZE - 1),
+                                    min(max(drone.position.y + drone.speed.y, 0), properties.MAP_SIZE - 1))
+
+            # Drone is repaired on the surface
+            if drone.emergency and drone.position.y == 0:
+                drone.emergency = False
+
+    @staticmethod
+    def get_drone_speed(drone: Drone, decision: Decision | None) -> Vector:
+        """
+        Speed of drone on this turn by its decision
+        :param decision: Decision of drone, None is going to the surface
         """
-        pass
+        if drone.emergency:
+            return Vector(0, -properties.DRONE_EMERGENCY_SPEED)
+        if decision is not None and decision.position is None:
+            return Vector(0, properties.DRONE_SINK_SPEED)
+
+        target = Vector(drone.position.x, 0) if decision is None else Vector(*decision.position)
+        speed = target - drone.position
+        if not speed.in_range(properties.DRONE_MAX_SPEED):
+            speed = speed.set_length(properties.DRONE_MAX_SPEED)
+        return speed.round()
 
     @staticmethod
-    def simulate(state: GameState, decisions: list[Decision]) -> int:
+    def simulate(state: GameState, decisions: list[Decision], depth: int = None, threshold: int = None) -> int:
         """
-        Simulate state until end of game
+        Simulate state until end of game or until the result is known
         :param state: State for simulation
-        :param decisions: List of decisions on how to move drones
+        :param decisions: Plan on how to move drones
+        :param depth: Number of turns to simulate, then all scanned fish are saved as at the end of the game.
+        Default is until end of game
+        :param threshold: Stop when the difference surely can't be greater, then its upper bound is returned
         :return: Player score difference at the end of the game
         """
-        referee = Referee(copy.deepcopy(state))
+        state = state.fork()
 
         # need to determinate fish speed (because need to kick some fish)
-        for fish in referee.state.fishes.values():
+        for fish in state.fishes.values():
             if fish.speed is None:
                 fish.speed = Vector()
 
+        referee = Referee(state, True, True)
+
         # game loop
-        while not referee.is_game_over():
+        step = 0
+        result = None
+        while not referee.is_game_over() and (depth is None or step < depth):
+            low, high = referee.get_score_bounds(None if depth is None else depth - step)
+            if low == high or threshold is not None and high <= threshold:
+                result = high
+                break
+
             referee.remove_to_lost()
-            referee.update_drone(decisions)
+            referee.update_drone(Decision.get_turn_decisions(decisions, step))
             referee.update_positions()
             referee.update_speed()
             referee.do_scan()
             referee.do_report()
+            referee.state.turn += 1
+            step += 1
+
+        telemetry.add('simulations')
+        telemetry.add('sim_turns', step)
+        if result is not None:
+            return result
 
         # in end of the game, save all scanned fish
         referee.do_report(True)
-
         return referee.state.score[0] - referee.state.score[1]
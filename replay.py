@@ -0,0 +1,102 @@
+from __future__ import annotations
+import argparse
+import glob
+import os
+import time
+from typing import Iterable, Iterator
+
+import properties
+from bot import Bot
+from game_input import GameReader
+from turn_log import TurnLog
+
+
+class ReplayResult:
+    """
+    Result of replay of one game log
+    """
+    path: str
+    turns: int
+    parse_time: float
+    action_times: list[float]
+    matches: int
+
+    def __init__(self, path: str):
+        self.path = path
+        self.turns = 0
+        self.parse_time = 0
+        self.action_times = []
+        self.matches = 0
+
+    def __str__(self):
+        mean = sum(self.action_times) / len(self.action_times) if self.action_times else 0
+        return f"{os.path.basename(self.path)}: {self.turns} turns, parse {self.parse_time * 1000:.1f} ms, \
+action mean {mean * 1000:.1f} ms max {max(self.action_times, default=0) * 1000:.1f} ms, \
+same output {self.matches}/{self.turns}"
+
+
+def replay(path: str, use_mmap: bool = True, first_turn_time: float = properties.FIRST_TURN_TIME,
+           turn_time: float = properties.TURN_TIME) -> ReplayResult:
+    """
+    Feed recorded input of game through the reader and the bot at full speed
+    :param path: Turn log
+    :param use_mmap: Map log into memory
+    :param first_turn_time: Time for bot response on the first turn
+    :param turn_time: Time for bot response on other turns
+    :return: Timings and number of turns where bot gave the recorded output
+    """
+    result = ReplayResult(path)
+
+    with TurnLog(path, use_mmap) as log:
+        outputs = log.get_outputs()
+        reader = GameReader(log.input_stream())
+        bot = Bot(reader.read_initialize(), first_turn_time, turn_time)
+
+        for output in outputs:
+            try:
+                bot.state = reader.read_state(bot.state)
+            except EOFError:
+                break
+
+            start = time.perf_counter()
+            action = str(bot.get_action())
+            result.action_times.append(time.perf_counter() - start)
+            result.parse_time += reader.parse_time
+            result.turns += 1
+            result.matches += action == output
+
+    return result
+
+
+def find_logs(paths: Iterable[str]) -> Iterator[str]:
+    """
+    Log files, directories are searched for *.log
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, '*.log')))
+        else:
+            yield from sorted(glob.glob(path))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay turn logs through the bot")
+    parser.add_argument('paths', nargs='+', help="Log files or directories")
+    parser.add_argument('--no-mmap', action='store_true', help="Read logs instead of memory mapping")
+    parser.add_argument('--turn-time', type=float, default=properties.TURN_TIME, help="Bot time per turn")
+    parser.add_argument('--first-turn-time', type=float, default=properties.FIRST_TURN_TIME,
+                        help="Bot time for the first turn")
+    args = parser.parse_args()
+
+    games = turns = matches = 0
+    for log_path in find_logs(args.paths):
+        try:
+            game = replay(log_path, not args.no_mmap, args.first_turn_time, args.turn_time)
+        except ValueError as error:
+            print(f"Skip {error}")
+            continue
+        print(game)
+        games += 1
+        turns += game.turns
+        matches += game.matches
+    print(f"{games} games, {turns} turns, same output {matches}/{turns}")
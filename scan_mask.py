@@ -0,0 +1,116 @@
+from typing import Iterable, Iterator
+
+import properties
+
+
+def fish_bit(fish_id: int) -> int:
+    """
+    Bit of fish in scan mask
+    """
+    return 1 << fish_id
+
+
+def iter_fish_ids(mask: int) -> Iterator[int]:
+    """
+    Fish ids of scan mask in ascending order
+    """
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+class ScoreTable:
+    """
+    Precomputed points and combo bonuses for every subset of scannable fishes.
+    Fish ids of the game are dense, so masks are shifted to the lowest id and used as table indexes.
+    Table has 2^width entries, for wider range of ids points and combos are summed by fish and group
+    """
+    MAX_WIDTH = 14
+
+    __offset: int
+    __full: int
+    __rewards: list[int]
+    __groups: list[tuple[int, int]]
+    __points: list[int] | None
+    __combos: list[int] | None
+
+    def __init__(self, fishes: Iterable):
+        """
+        :param fishes: All fishes of the game (swimming and lost), ugly are skipped
+        """
+        fishes = [fish for fish in fishes if fish.kind in properties.REWARDS]
+        self.__offset = min((fish.fish_id for fish in fishes), default=0)
+        width = max((fish.fish_id for fish in fishes), default=-1) - self.__offset + 1
+        self.__full = (1 << width) - 1
+
+        # combo groups: all fishes with the same color or the same kind
+        rewards = [0] * width
+        groups = {}
+        for fish in fishes:
+            bit = fish.fish_id - self.__offset
+            rewards[bit] = properties.REWARDS[fish.kind]
+            for group, value in ((fish.color, properties.REWARDS_COLOR), (fish.kind, properties.REWARDS_KIND)):
+                mask, _ = groups.get(group, (0, value))
+                groups[group] = mask | 1 << bit, value
+
+        self.__rewards = rewards
+        self.__groups = list(groups.values())
+        self.__points = self.__combos = None
+        if width > ScoreTable.MAX_WIDTH:
+            return
+
+        # points[mask] = points[mask without lowest bit] + reward of lowest bit
+        self.__points = [0] * (1 << width)
+        for mask in range(1, 1 << width):
+            self.__points[mask] = self.__points[mask & (mask - 1)] + rewards[(mask & -mask).bit_length() - 1]
+
+        self.__combos = [self.get_combos(mask) for mask in range(1 << width)]
+
+    def get_points(self, mask: int) -> int:
+        """
+        Points for fishes of shifted mask
+        """
+        if self.__points is not None:
+            return self.__points[mask]
+        return sum(self.__rewards[bit] for bit in iter_fish_ids(mask))
+
+    def get_combos(self, mask: int) -> int:
+        """
+        Bonuses for completed groups of shifted mask
+        """
+        if self.__combos is not None:
+            return self.__combos[mask]
+        return sum(value for group, value in self.__groups if mask & group == group)
+
+    def get_score(self, saved: int, scans: int, bonus: bool = False) -> int:
+        """
+        Score for saving new scans
+        :param saved: Mask of already saved fishes
+        :param scans: Mask of new saved fishes (without already saved)
+        :param bonus: It is first scan with bonus
+        :return: Points for fishes and completed combos
+        """
+        saved = saved >> self.__offset & self.__full
+        scans = scans >> self.__offset & self.__full
+        if self.__points is None:
+            score = self.get_points(scans) + self.get_combos(saved | scans) - self.get_combos(saved)
+        else:
+            score = self.__points[scans] + self.__combos[saved | scans] - self.__combos[saved]
+        return score * 2 if bonus else score
+
+    def get_max_score(self, saved: int, scans: int, first: int) -> int:
+        """
+        Upper bound of score for saving scans by any number of reports in any order
+        :param saved: Mask of already saved fishes
+        :param scans: Mask of fishes which still can be saved
+        :param first: Mask of fishes which can be saved first (with bonus)
+        :return: Points for fishes (doubled for first) and all completed combos doubled
+        """
+        saved = saved >> self.__offset & self.__full
+        scans = scans >> self.__offset & self.__full & ~saved
+        first = first >> self.__offset & scans
+        if self.__points is None:
+            return self.get_points(scans) + self.get_points(first) \
+                + 2 * (self.get_combos(saved | scans) - self.get_combos(saved))
+        return self.__points[scans] + self.__points[first] + 2 * (self.__combos[saved | scans] - self.__combos[saved])
@@ -0,0 +1,482 @@
+from __future__ import annotations
+import random
+import threading
+import time
+from collections import deque
+from math import sqrt
+
+import numpy as np
+
+import properties
+from belief import Belief
+from danger_field import DangerField
+from decisions import Decision
+from game_actions import GameAction, GameActionList, GameActionMove, GameActionWait
+from game_objects import GameState, FishKind
+from referee import Referee
+from transposition import Zobrist, TranspositionTable
+from vector_referee import VectorReferee
+
+
+class Search:
+    """
+    Rolling horizon evolution of plans for my drones.
+    Population of plans is improved by mutations until deadline,
+    all candidates of one generation are evaluated by one batch of rollouts.
+    Evaluations are kept in transposition table by root state and plan, so repeated plans are not simulated again.
+    Different plans to the same final state are not merged there, the score depends on the order of scans and reports,
+    but population keeps one plan per final state.
+    With belief, every batch is simulated in its own world where hidden fishes are sampled from particles.
+    Offspring caught at once near the most of particles of hidden uglies are dropped, rollouts skip ugly checks
+    of the first turn far from all particles
+    """
+    HORIZON = 20
+    GENES = 2
+    POPULATION = 8
+    OFFSPRING = 24
+    LIGHT_RATE = 0.3
+    MUTATION_RADIUS = 1000
+    FIRST_BATCH_TIME = 0.02
+    FIRST_PLAN_TIME = 0.001
+    BATCH_HISTORY = 32
+    MIN_BATCHES = 3
+    JITTER_SIGMAS = 2
+    STALL_DECAY = 0.7
+    PONDER_SLICE = 1.0
+    PREDICTED_KEY = 0x5DEECE66D2B7E151
+    DANGER_QUANTILE = 0.5
+
+    state: GameState
+    drone_ids: list[int]
+    population: list[tuple[int, int, list[Decision], int, int | None]]
+    pending: list[tuple[int, list[Decision]]]
+    generations: int
+    rollouts: int
+    reused_plans: int
+    reused_rollouts: int
+    cached: int
+    unsafe: int
+    batches: deque[tuple[int, float]]
+    batch_time: float
+    plan_time: float
+    deviation: float
+    rng: random.Random
+    zobrist: Zobrist
+    table: TranspositionTable
+    root_hash: int
+    danger: DangerField
+    full_danger: DangerField
+    belief: Belief | None
+
+    def __init__(self, state: GameState, seed: int = None, belief: Belief = None):
+        """
+        :param state: Root state, it is not changed by search
+        :param seed: Seed for random generator
+        :param belief: Belief about hidden fishes of root states, default is their positions in state
+        """
+        self.state = state
+        self.belief = belief
+        self.drone_ids = [drone.drone_id for drone in state.drones.values() if drone.player_id == 0]
+        self.population = []
+        self.pending = []
+        self.generations = 0
+        self.rollouts = 0
+        self.reused_plans = 0
+        self.reused_rollouts = 0
+        self.cached = 0
+        self.unsafe = 0
+        self.batches = deque(maxlen=Search.BATCH_HISTORY)
+        self.batch_time, self.plan_time, self.deviation = Search.FIRST_BATCH_TIME, Search.FIRST_PLAN_TIME, 0.0
+        self.rng = random.Random(seed)
+        self.zobrist = Zobrist(*Zobrist.get_limits(state))
+        self.table = TranspositionTable()
+        self.root_hash = self.zobrist.hash_state(state)
+        self.danger = DangerField(state, self.belief, Search.DANGER_QUANTILE)
+        self.full_danger = DangerField(state, self.belief)
+
+    def random_position(self, drone_id: int) -> tuple[int, int]:
+        """
+        Waypoint: unscanned fish, surface or any point of the map
+        """
+        drone = self.state.drones[drone_id]
+        choice = self.rng.random()
+
+        if choice < 1 / 3:
+            known = drone.scans | self.state.scans[drone.player_id]
+            fishes = [fish for fish in self.state.fishes.values()
+                      if fish.kind != FishKind.ANGLER and not known >> fish.fish_id & 1]
+            if fishes:
+                position = self.rng.choice(fishes).position
+                return round(position.x), round(position.y)
+        if choice < 2 / 3:
+            return round(drone.position.x), 0
+        return self.rng.randrange(properties.MAP_SIZE), self.rng.randrange(properties.MAP_SIZE)
+
+    def random_plan(self) -> list[Decision]:
+        """
+        Plan with GENES decisions per drone for HORIZON turns
+        """
+        plan = []
+        for drone_id in self.drone_ids:
+            bounds = sorted(self.rng.sample(range(1, Search.HORIZON), Search.GENES - 1)) + [Search.HORIZON]
+            start = 0
+            for bound in bounds:
+                plan.append(Decision(drone_id, self.random_position(drone_id),
+                                     self.rng.random() < Search.LIGHT_RATE, bound - start))
+                start = bound
+        return plan
+
+    def mutate(self, plan: list[Decision]) -> list[Decision]:
+        """
+        Copy of plan with one changed decision
+        """
+        plan = [Decision(d.drone_id, d.position, d.light, d.turns) for d in plan]
+        if not plan:
+            return self.random_plan()
+
+        index = self.rng.randrange(len(plan))
+        decision = plan[index]
+        choice = self.rng.random()
+
+        if choice < 0.4 and decision.position is not None:
+            decision.position = tuple(
+                min(max(round(coord + self.rng.gauss(0, Search.MUTATION_RADIUS)), 0), properties.MAP_SIZE - 1)
+                for coord in decision.position)
+        elif choice < 0.6:
+            decision.light = not decision.light
+        elif choice < 0.8 and index + 1 < len(plan) and plan[index + 1].drone_id == decision.drone_id:
+            # move bound between neighbour decisions of the drone
+            total = decision.turns + plan[index + 1].turns
+            decision.turns = self.rng.randrange(1, total)
+            plan[index + 1].turns = total - decision.turns
+        else:
+            decision.position = self.random_position(decision.drone_id)
+
+        return plan
+
+    @staticmethod
+    def shift_plan(plan: list[Decision]) -> list[Decision]:
+        """
+        Plan for the next turn: the first turn of every drone is removed, the last decision is extended
+        """
+        shifted, started = [], set()
+
+        for decision in plan:
+            turns = decision.turns
+            if decision.drone_id not in started:
+                started.add(decision.drone_id)
+                turns -= 1
+            if turns > 0:
+                shifted.append(Decision(decision.drone_id, decision.position, decision.light, turns))
+
+        last = {decision.drone_id: decision for decision in shifted}
+        for decision in last.values():
+            decision.turns += 1
+
+        return shifted
+
+    def shift(self, state: GameState, predicted: bool = False) -> None:
+        """
+        Continue search on the next turn: plans of population are shifted by one turn
+        and evaluated again on the new state before new generations
+        :param state: New root state
+        :param predicted: State is predicted, not received
+        """
+        carried = [(age + 1, Search.shift_plan(plan)) for age, plan in self.get_carried()]
+        self.set_root(state, carried + [(0, [])], predicted)
+
+    def rebase(self, state: GameState) -> None:
+        """
+        Continue search of the same turn on another state (the received one after search on the predicted one):
+        plans of population are evaluated again on the new state
+        :param state: New root state
+        """
+        self.set_root(state, self.get_carried())
+
+    def get_carried(self) -> list[tuple[int, list[Decision]]]:
+        """
+        Plans with their ages for the next root: population, then plans which were not evaluated in time
+        """
+        carried = [(age, plan) for _, age, plan, _, _ in self.population] + self.pending
+        return carried[:Search.POPULATION]
+
+    def set_root(self, state: GameState, pending: list[tuple[int, list[Decision]]], predicted: bool = False) -> None:
+        """
+        Start search on the new root state, evaluations of predicted state are not mixed with received ones
+        :param state: New root state
+        :param pending: Plans for evaluation with their ages
+        :param predicted: State is predicted, not received
+        """
+        self.state = state
+        self.drone_ids = [drone.drone_id for drone in state.drones.values() if drone.player_id == 0]
+        self.pending = pending
+        self.population = []
+        self.table.new_generation()
+        self.root_hash = self.zobrist.hash_state(state) ^ (Search.PREDICTED_KEY if predicted else 0)
+        self.danger = DangerField(state, self.belief, Search.DANGER_QUANTILE)
+        self.full_danger = DangerField(state, self.belief)
+
+        self.reused_plans = len(self.pending)
+        self.reused_rollouts += self.rollouts
+        self.generations = 0
+        self.rollouts = 0
+        self.cached = 0
+        self.unsafe = 0
+
+    def get_best_age(self) -> int:
+        """
+        Number of turns the best plan was carried from previous turns
+        """
+        return self.population[0][1] if self.population else 0
+
+    @staticmethod
+    def get_plan_key(plan: list[Decision]) -> int:
+        """
+        Hash of plan within horizon, neighbour decisions with the same command are merged
+        """
+        commands, last, passed = [], {}, {}
+        for decision in plan:
+            turns = min(decision.turns, Search.HORIZON - passed.get(decision.drone_id, 0))
+            if turns <= 0:
+                continue
+            passed[decision.drone_id] = passed.get(decision.drone_id, 0) + turns
+            command = decision.drone_id, decision.position, decision.light
+            if last.get(decision.drone_id) == command:
+                commands[-1] = command + (commands[-1][3] + turns,)
+            else:
+                commands.append(command + (turns,))
+            last[decision.drone_id] = command
+        return hash(tuple(commands))
+
+    def get_key(self, plan: list[Decision]) -> int:
+        """
+        Key of plan evaluation in transposition table
+        """
+        return self.root_hash ^ Search.get_plan_key(plan)
+
+    def get_threshold(self) -> int | None:
+        """
+        Score which a plan must exceed to get into full population
+        """
+        return self.population[-1][0] if len(self.population) >= Search.POPULATION else None
+
+    def get_safe(self, plans: list[list[Decision]]) -> list[bool]:
+        """
+        Ugly can't catch my drones on the first turn of plans, all plans are checked by danger field at once
+        """
+        drones = [self.state.drones[drone_id] for drone_id in self.drone_ids
+                  if not self.state.drones[drone_id].emergency]
+        if not drones or not plans:
+            return [True] * len(plans)
+
+        start = [(drone.position.x, drone.position.y) for drone in drones]
+        end = []
+        for plan in plans:
+            decisions = {decision.drone_id: decision for decision in Decision.get_turn_decisions(plan, 0)}
+            speeds = [Referee.get_drone_speed(drone, decisions.get(drone.drone_id)) for drone in drones]
+            end.append([(x + speed.x, y + speed.y) for (x, y), speed in zip(start, speeds)])
+        start = np.array(start, dtype=np.float64)
+        return self.danger.get_safe(start, np.array(end, dtype=np.float64)).all(axis=1).tolist()
+
+    def get_offspring(self, count: int) -> list[list[Decision]]:
+        """
+        Mutations of population, plans which were already evaluated or which are caught by ugly at once
+        are replaced by new ones. Mutations are made for the missing offspring and checked for danger together
+        """
+        parents = [item[2] for item in self.population]
+        threshold = self.get_threshold()
+        offspring, keys, attempts = [], set(), count * 2
+        while attempts > 0 and len(offspring) < count:
+            candidates = []
+            while attempts > 0 and len(offspring) + len(candidates) < count:
+                attempts -= 1
+                plan = self.mutate(self.rng.choice(parents))
+                key = self.get_key(plan)
+                if key in keys or self.table.get(key, Search.HORIZON, threshold) is not None:
+                    self.cached += 1
+                    continue
+                candidates.append(plan)
+                keys.add(key)
+
+            safe = self.get_safe(candidates)
+            offspring += [plan for plan, is_safe in zip(candidates, safe) if is_safe]
+            self.unsafe += len(candidates) - sum(safe)
+        return offspring
+
+    def evaluate(self, plans: list[list[Decision]], ages: list[int] = None, stop: threading.Event = None) -> None:
+        """
+        Simulate plans in one batch and keep the best in population, plans from transposition table are not simulated
+        :param plans: Plans for evaluation
+        :param ages: Number of turns every plan was carried, default is new plans
+        :param stop: Batch is dropped when it is set
+        """
+        if ages is None:
+            ages = [0] * len(plans)
+        # rollout which can't get into full population is stopped, its score is upper bound under threshold
+        threshold = self.get_threshold()
+        keys = [self.get_key(plan) for plan in plans]
+        scores = [self.table.get(key, Search.HORIZON, threshold) for key in keys]
+        finals = [None] * len(plans)
+
+        # equal plans of batch are simulated once
+        missing = {key: plan for key, plan, score in zip(keys, plans, scores) if score is None}
+        if missing:
+            root = self.state if self.belief is None else self.belief.sample(self.state)
+            referee = VectorReferee(root, len(missing), self.full_danger)
+            referee.set_plans(list(missing.values()))
+            results = referee.play(Search.HORIZON, threshold, stop)
+            if results is None:
+                return
+            results = results.tolist()
+            # final states of stopped worlds are not known
+            hashes = [None] * len(missing)
+            for world, final in zip(referee.worlds.tolist(), self.zobrist.hash_worlds(referee).tolist()):
+                hashes[world] = final
+            results = dict(zip(missing, zip(results, hashes)))
+
+            for key, (score, final) in results.items():
+                self.table.put(key, score, Search.HORIZON, final is None)
+            for i, key in enumerate(keys):
+                if key in results:
+                    scores[i], finals[i] = results[key]
+        self.cached += len(plans) - len(missing)
+
+        # of plans with the same key or final state the best one is kept, the older one of equal scores
+        candidates = self.population + list(zip(scores, ages, plans, keys, finals))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        self.population = []
+        seen_keys, seen_finals = set(), set()
+        for item in candidates:
+            key, final = item[3], item[4]
+            if key in seen_keys or final is not None and final in seen_finals:
+                continue
+            seen_keys.add(key)
+            if final is not None:
+                seen_finals.add(final)
+            self.population.append(item)
+            if len(self.population) == Search.POPULATION:
+                break
+
+        self.generations += 1
+        self.rollouts += len(missing)
+
+    def run(self, deadline: float, stop: threading.Event = None) -> list[Decision]:
+        """
+        Improve plans until deadline
+        :param deadline: Time (perf_counter) to return result
+        :param stop: Search is stopped when it is set, even in the middle of batch
+        :return: The best plan found so far
+        """
+        if not self.drone_ids:
+            return []
+
+        evaluated = False
+        while stop is None or not stop.is_set():
+            # batch is limited by the time left
+            start = time.perf_counter()
+            count = self.get_batch_size(deadline - start)
+            if count < 1:
+                # estimate which does not let any batch run can't be corrected by measurement, its jitter decays,
+                # so the margin of the next turn is less
+                if not evaluated:
+                    self.deviation *= Search.STALL_DECAY
+                break
+            evaluated = True
+            rollouts = self.rollouts
+
+            if self.pending:
+                # carried plans are scored on the new root first, so offspring are bred from fresh scores
+                batch, pending = self.pending[:count], self.pending[count:]
+                self.evaluate([plan for _, plan in batch], [age for age, _ in batch], stop)
+                if stop is None or not stop.is_set():
+                    self.pending = pending
+            elif not self.population:
+                self.evaluate([[]] + [self.random_plan() for _ in range(min(Search.POPULATION, count) - 1)],
+                              stop=stop)
+            else:
+                self.evaluate(self.get_offspring(min(Search.OFFSPRING, count)), stop=stop)
+
+            # batches of cached plans don't tell the time of rollouts
+            if self.rollouts > rollouts:
+                self.batches.append((self.rollouts - rollouts, time.perf_counter() - start))
+                self.fit_batch_time()
+
+        return self.get_best()
+
+    def get_batch_time(self, count: int = 1) -> float:
+        """
+        Expected time of batch: fixed time of batch and time of its plans
+        """
+        return self.batch_time + self.plan_time * count
+
+    def get_slow_batch_time(self, count: int = 1) -> float:
+        """
+        Pessimistic time of batch: expected time and JITTER_SIGMAS deviations of measurements
+        """
+        return self.get_batch_time(count) + Search.JITTER_SIGMAS * self.deviation
+
+    def get_batch_size(self, remaining: float) -> int:
+        """
+        Number of plans whose batch is simulated in time by pessimistic estimate.
+        When even the slow batch of one plan does not fit, the batch of one plan still runs if it is expected in time,
+        its overrun is limited by the margin of the turn
+        """
+        if remaining < self.get_batch_time():
+            return 0
+        if self.plan_time <= 0:
+            return Search.OFFSPRING
+        return max(int((remaining - self.get_slow_batch_time(0)) / self.plan_time), 1)
+
+    def fit_batch_time(self) -> None:
+        """
+        Fixed time of batch and time of plan by least squares over the last measured batches,
+        prior is kept until there are enough of them. Most of batch time is fixed: every turn of rollouts
+        costs the same for any number of worlds
+        """
+        if len(self.batches) < Search.MIN_BATCHES:
+            return
+
+        count = len(self.batches)
+        mean_size = sum(size for size, _ in self.batches) / count
+        mean_time = sum(elapsed for _, elapsed in self.batches) / count
+        variance = sum((size - mean_size) ** 2 for size, _ in self.batches)
+        # batches of one size don't tell time of plan, it is kept
+        if variance > 0:
+            covariance = sum((size - mean_size) * (elapsed - mean_time) for size, elapsed in self.batches)
+            self.plan_time = max(covariance / variance, 0)
+        self.batch_time = max(mean_time - self.plan_time * mean_size, 0)
+        self.deviation = sqrt(sum((elapsed - self.batch_time - self.plan_time * size) ** 2
+                                  for size, elapsed in self.batches) / (count - 1))
+
+    def ponder(self, stop: threading.Event) -> None:
+        """
+        Improve plans until stop is set, for search in background
+        """
+        while self.drone_ids and not stop.is_set():
+            self.run(time.perf_counter() + Search.PONDER_SLICE, stop)
+
+    def get_best(self) -> list[Decision]:
+        """
+        The best evaluated plan, else the best plan of the previous turn
+        """
+        if self.population:
+            return self.population[0][2]
+        return self.pending[0][1] if self.pending else []
+
+    def get_action(self, plan: list[Decision]) -> GameAction:
+        """
+        Actions of my drones for the first turn of plan
+        """
+        decisions = {decision.drone_id: decision for decision in Decision.get_turn_decisions(plan, 0)}
+        actions = []
+
+        for drone_id in self.drone_ids:
+            decision = decisions.get(drone_id)
+            if decision is None:
+                actions.append(GameActionMove((round(self.state.drones[drone_id].position.x), 0)))
+            elif decision.position is None:
+                actions.append(GameActionWait(decision.light))
+            else:
+                actions.append(GameActionMove(decision.position, decision.light))
+
+        return GameActionList(actions)
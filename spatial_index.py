@@ -0,0 +1,95 @@
+from __future__ import annotations
+from typing import Hashable, Iterable
+
+import properties
+from game_math import Vector
+
+
+class SpatialGrid:
+    """
+    Uniform grid of buckets over the map for neighbour queries.
+    Every entity is stored by key with its position, positions outside the map go to the border cells
+    """
+    __cell_size: int
+    __columns: int
+    __cells: list[dict[Hashable, Vector]]
+    __cell_of: dict[Hashable, int]
+
+    def __init__(self, cell_size: int = properties.MIN_DISTANCE_BT_FISH, size: int = properties.MAP_SIZE):
+        """
+        :param cell_size: Size of the bucket, the best is the most frequent query radius
+        :param size: Size of the square map
+        """
+        self.__cell_size = cell_size
+        self.__columns = (size - 1) // cell_size + 1
+        self.__cells = [{} for _ in range(self.__columns ** 2)]
+        self.__cell_of = {}
+
+    @staticmethod
+    def build(entities: Iterable[tuple[Hashable, Vector]], cell_size: int = properties.MIN_DISTANCE_BT_FISH) \
+            -> SpatialGrid:
+        """
+        Build grid from pairs of key and position
+        """
+        grid = SpatialGrid(cell_size)
+        for key, position in entities:
+            grid.update(key, position)
+        return grid
+
+    def __len__(self) -> int:
+        return len(self.__cell_of)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__cell_of
+
+    def __column(self, coord: int | float) -> int:
+        return min(max(int(coord // self.__cell_size), 0), self.__columns - 1)
+
+    def clear(self) -> None:
+        for cell in self.__cells:
+            cell.clear()
+        self.__cell_of.clear()
+
+    def update(self, key: Hashable, position: Vector) -> None:
+        """
+        Insert entity or move it to the new position
+        """
+        index = self.__column(position.y) * self.__columns + self.__column(position.x)
+        last_index = self.__cell_of.get(key)
+
+        if last_index is not None and last_index != index:
+            del self.__cells[last_index][key]
+        self.__cells[index][key] = position
+        self.__cell_of[key] = index
+
+    def remove(self, key: Hashable) -> None:
+        index = self.__cell_of.pop(key, None)
+        if index is not None:
+            del self.__cells[index][key]
+
+    def __cells_in_range(self, position: Vector, r: int | float) -> Iterable[dict[Hashable, Vector]]:
+        from_x, to_x = self.__column(position.x - r), self.__column(position.x + r)
+        for row in range(self.__column(position.y - r), self.__column(position.y + r) + 1):
+            yield from self.__cells[row * self.__columns + from_x:row * self.__columns + to_x + 1]
+
+    def query(self, position: Vector, r: int | float) -> list[Hashable]:
+        """
+        Get entities within the circle
+        :param position: Center of circle
+        :param r: Radius of circle
+        :return: List of keys
+        """
+        return [key for cell in self.__cells_in_range(position, r) for key, coord in cell.items()
+                if coord.in_range_vec(position, r)]
+
+    def get_closest(self, position: Vector, r: int | float, exclude: Hashable = None) -> list[Vector]:
+        """
+        Get closest positions with equal distance within the circle
+        :param position: Center of circle
+        :param r: Radius of circle
+        :param exclude: Key of entity to skip (usually entity at the center)
+        :return: List of closest positions
+        """
+        return position.get_closest_in_range(
+            (coord for cell in self.__cells_in_range(position, r) for key, coord in cell.items() if key != exclude),
+            r)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import os
+import sys
+import time
+from typing import TextIO
+
+
+class Timer:
+    """
+    Context manager which adds its time to the value of telemetry
+    """
+    __slots__ = ('telemetry', 'name', 'start')
+
+    def __init__(self, telemetry: Telemetry, name: str):
+        self.telemetry = telemetry
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> Timer:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.telemetry.add_time(self.name, time.perf_counter() - self.start)
+
+
+class NullTimer:
+    """
+    Timer of switched off telemetry
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> NullTimer:
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class Telemetry:
+    """
+    Per-turn counters and timers, one line per turn on stderr and summary at the end of the game.
+    When it is switched off, every call returns at once
+    """
+    enabled: bool
+    stream: TextIO
+    values: dict[str, float]
+    times: set[str]
+    totals: dict[str, list[float]]
+    turns: int
+
+    def __init__(self, enabled: bool = False, stream: TextIO = None):
+        """
+        :param enabled: Collect and print values
+        :param stream: Output, default is stderr
+        """
+        self.enabled = enabled
+        self.stream = sys.stderr if stream is None else stream
+        self.values = {}
+        self.times = set()
+        self.totals = {}
+        self.turns = 0
+
+    def timer(self, name: str) -> Timer | NullTimer:
+        """
+        Context manager measuring time of block
+        """
+        return Timer(self, name) if self.enabled else NULL_TIMER
+
+    def add_time(self, name: str, value: float) -> None:
+        if self.enabled:
+            self.times.add(name)
+            self.values[name] = self.values.get(name, 0) + value
+
+    def set_time(self, name: str, value: float) -> None:
+        if self.enabled:
+            self.times.add(name)
+            self.values[name] = value
+
+    def add(self, name: str, value: float = 1) -> None:
+        if self.enabled:
+            self.values[name] = self.values.get(name, 0) + value
+
+    def set(self, name: str, value: float) -> None:
+        if self.enabled:
+            self.values[name] = value
+
+    def format(self, name: str, value: float) -> str:
+        """
+        Times are printed in milliseconds
+        """
+        return f"{name} {value * 1000:.2f}" if name in self.times else f"{name} {value:.6g}"
+
+    def end_turn(self, turn: int) -> None:
+        """
+        Print values of turn as one line and add them to totals
+        """
+        if not self.enabled:
+            return
+
+        print(f"T{turn} " + " ".join(self.format(name, value) for name, value in self.values.items()),
+              file=self.stream)
+
+        for name, value in self.values.items():
+            total = self.totals.get(name)
+            if total is None:
+                self.totals[name] = [value, value, value, 1]
+            else:
+                total[0] += value
+                total[1] = min(total[1], value)
+                total[2] = max(total[2], value)
+                total[3] += 1
+        self.values = {}
+        self.turns += 1
+
+    def summary(self) -> None:
+        """
+        Print mean, min and max of every value over turns where it was set
+        """
+        if not self.enabled or not self.turns:
+            return
+
+        print(f"Summary of {self.turns} turns (mean/min/max)", file=self.stream)
+        for name, (total, low, high, count) in self.totals.items():
+            scale = 1000 if name in self.times else 1
+            print(f"  {name} {total / count * scale:.6g}/{low * scale:.6g}/{high * scale:.6g}", file=self.stream)
+
+
+telemetry = Telemetry(bool(os.environ.get('TELEMETRY')))
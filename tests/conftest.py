@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# modules of the bot are flat, they are imported as in the CodinGame bundle
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
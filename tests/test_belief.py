@@ -0,0 +1,84 @@
+import numpy as np
+
+import properties
+from belief import Belief
+from game_objects import BlipType
+from match_runner import new_game
+
+FISH_ID = 6
+
+
+def test_predict_moves_particles_by_fish_physics():
+    state = new_game(0)
+    belief = Belief(state, 4, seed=0)
+    i = belief.fish_ids.index(FISH_ID)
+    drone = state.drones[0]
+    # free, and frightened by the drone on its right
+    belief.position[i] = (5000, 6000), (5000, 6000), (drone.position.x - 1000, drone.position.y), (5000, 6000)
+    belief.speed[i] = (200, 0), (0, -200), (0, 0), (200, 0)
+    belief.habitat[i] = 0, properties.MAP_SIZE - 1
+
+    belief.predict(state)
+    assert belief.position[i, :2].tolist() == [[5200, 6000], [5000, 5800]]
+    assert belief.speed[i, :2].tolist() == [[200, 0], [0, -200]]
+    assert belief.speed[i, 2].tolist() == [-properties.FISH_FRIGHTENED_SPEED, 0]
+
+
+def test_observe_filters_by_radar_and_light():
+    state = new_game(0)
+    belief = Belief(state, 4, seed=0)
+    i = belief.fish_ids.index(FISH_ID)
+    drone = state.drones[0]
+    drone.radar_blips[FISH_ID] = BlipType.BR
+    x, y = drone.position.x, drone.position.y
+    # bottom right, left of drone, in the light of drone, bottom right again
+    belief.position[i] = (x + 500, y + 5000), (x - 500, y + 5000), (x + 300, y + 300), (x + 1000, y + 1000)
+
+    valid = belief.observe(state)
+    assert valid[i].tolist() == [True, False, False, True]
+
+
+def test_resample_copies_consistent_particles():
+    state = new_game(0)
+    belief = Belief(state, 64, seed=0)
+    i = belief.fish_ids.index(FISH_ID)
+    valid = np.zeros(belief.position.shape[:2], dtype=bool)
+    valid[:, 0] = True
+    particle, speed = belief.position[i, 0].copy(), belief.speed[i, 0].copy()
+
+    belief.resample(valid, state)
+    assert (np.abs(belief.position[i] - particle) <= Belief.JITTER).all()
+    assert (belief.speed[i] == speed).all()
+
+
+def test_resample_respawns_fish_in_radar_zone():
+    state = new_game(0)
+    belief = Belief(state, 64, seed=0)
+    i = belief.fish_ids.index(FISH_ID)
+    drone = state.drones[0]
+    drone.radar_blips[FISH_ID] = BlipType.BL
+    valid = np.ones(belief.position.shape[:2], dtype=bool)
+    valid[i] = False
+
+    belief.resample(valid, state)
+    low, high = properties.HABITAT[state.fishes[FISH_ID].kind]
+    assert (belief.position[i, :, 0] <= drone.position.x).all()
+    assert ((belief.position[i, :, 1] > drone.position.y) & (belief.position[i, :, 1] >= low)
+            & (belief.position[i, :, 1] <= high)).all()
+
+
+def test_sample_draws_hidden_fishes_from_particles():
+    state = new_game(0)
+    visible = state.fishes[4]
+    visible.last_seen, position = 0, visible.position
+    belief = Belief(state, 8, seed=0)
+    belief.update(state)
+
+    world = belief.sample(state)
+    assert world.fishes[4].position == position
+    for i, fish_id in enumerate(belief.fish_ids):
+        if fish_id != 4:
+            fish = world.fishes[fish_id]
+            assert [fish.position.x, fish.position.y] in belief.position[i].tolist()
+            assert state.fishes[fish_id].position is not fish.position
+    assert state.fishes[4].position == position
@@ -0,0 +1,28 @@
+import numpy as np
+
+from benchmarks import CALIBRATION, AllocationCounter, report
+
+BASELINE = {CALIBRATION: [100.0, 0.01, 0, 0], 'noisy': [10.0, 0.2, 0, 0], 'steady': [10.0, 0.01, 0, 0],
+            'alloc': [10.0, 0.01, 2, 0], 'memory': [10.0, 0.01, 0, 8000]}
+
+
+def test_change_within_spread_is_noise(capsys):
+    # the machine is twice slower, so are all benchmarks
+    results = {CALIBRATION: (200.0, 0.01, 0, 0), 'noisy': (23.0, 0.2, 0, 0), 'steady': (20.4, 0.01, 0, 0),
+               'alloc': (20.0, 0.01, 2, 0), 'memory': (20.0, 0.01, 0, 8200)}
+    assert report(results, BASELINE) == 0
+    assert '!' not in capsys.readouterr().out
+
+
+def test_change_beyond_spread_is_regression(capsys):
+    # +30% is beyond noise of medians, though within the sum of spreads
+    results = {CALIBRATION: (100.0, 0.01, 0, 0), 'noisy': (13.0, 0.2, 0, 0), 'steady': (11.0, 0.01, 0, 0),
+               'alloc': (10.0, 0.01, 3, 0), 'memory': (10.0, 0.01, 0, 80000)}
+    assert report(results, BASELINE) == 4
+    assert capsys.readouterr().out.count('!') == 4
+
+
+def test_numpy_memory_is_counted():
+    with AllocationCounter() as counter:
+        np.zeros(100000)
+    assert counter.count == 0 and counter.peak >= 800000
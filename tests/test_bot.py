@@ -0,0 +1,67 @@
+import statistics
+import time
+
+import properties
+from match_runner import BotPlayer, format_initialize, format_turn, new_game, parse_actions
+from referee import Referee
+from search import Search
+
+TURN_TIME = 0.05
+
+
+def test_search_evolves_within_turn_time():
+    state = new_game(1)
+    referee = Referee(state, True)
+    player = BotPlayer(0, format_initialize(state), properties.FIRST_TURN_TIME, TURN_TIME, seed=0)
+    drone_ids = [drone.drone_id for drone in state.drones.values() if drone.player_id == 0]
+
+    generations, rollouts = [], []
+    for _ in range(10):
+        decisions = parse_actions(player.play(format_turn(state, 0)), drone_ids)
+        if state.turn > 1:
+            generations.append(player.bot.search.generations)
+            rollouts.append(player.bot.search.rollouts)
+        referee.remove_to_lost()
+        referee.update_drone(decisions)
+        referee.update_positions()
+        referee.update_speed()
+        referee.do_scan()
+        referee.do_report()
+        state.turn += 1
+
+    # carried plans are scored again on every turn and bred on most of them
+    assert statistics.mean(generations) > 1
+    assert statistics.median(rollouts) >= Search.POPULATION
+    assert statistics.median(player.times[1:]) < TURN_TIME
+
+
+def play_turn(referee: Referee, decisions: list) -> None:
+    referee.remove_to_lost()
+    referee.update_drone(decisions)
+    referee.update_positions()
+    referee.update_speed()
+    referee.do_scan()
+    referee.do_report()
+    referee.state.turn += 1
+
+
+def test_ponder_hands_plans_over_to_received_state():
+    state = new_game(2)
+    referee = Referee(state, True)
+    player = BotPlayer(0, format_initialize(state), TURN_TIME, TURN_TIME, seed=0)
+    drone_ids = [drone.drone_id for drone in state.drones.values() if drone.player_id == 0]
+    play_turn(referee, parse_actions(player.play(format_turn(state, 0)), drone_ids))
+
+    bot = player.bot
+    bot.start_ponder()
+    time.sleep(TURN_TIME)
+    bot.stop_ponder()
+    # search ran on the predicted state of the next turn, its scores are not mixed with the received one
+    assert bot.ponder is None and bot.search.rollouts > 0 and bot.search.state.turn == state.turn
+    predicted_hash = bot.search.root_hash
+    assert predicted_hash != bot.search.zobrist.hash_state(bot.search.state)
+
+    decisions = parse_actions(player.play(format_turn(state, 0)), drone_ids)
+    assert not bot.pondered and bot.search.reused_plans > 0
+    assert bot.search.root_hash == bot.search.zobrist.hash_state(bot.search.state) != predicted_hash
+    assert sorted(decision.drone_id for decision in decisions) == drone_ids
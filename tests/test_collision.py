@@ -0,0 +1,32 @@
+import random
+
+import numpy as np
+
+import properties
+from collision import get_swept_collisions
+from game_math import Vector
+from game_objects import Drone, Fish
+from referee import Referee
+
+
+def test_swept_collisions_equal_referee():
+    rng = random.Random(25)
+    for _ in range(50):
+        drones, uglies = [Drone(i, i % 2) for i in range(4)], [Fish(16 + i) for i in range(6)]
+        for entity in drones + uglies:
+            # crowded area, so hits, misses and starts in range all happen
+            entity.position = Vector(rng.randrange(2000), rng.randrange(2000))
+            entity.speed = Vector(rng.randint(-600, 600), rng.randint(-600, 600))
+
+        drone_start = np.array([(drone.position.x, drone.position.y) for drone in drones], dtype=np.float64)
+        drone_speed = np.array([(drone.speed.x, drone.speed.y) for drone in drones], dtype=np.float64)
+        ugly_start = np.array([(ugly.position.x, ugly.position.y) for ugly in uglies], dtype=np.float64)
+        ugly_speed = np.array([(ugly.speed.x, ugly.speed.y) for ugly in uglies], dtype=np.float64)
+        hit, t = get_swept_collisions(drone_start, drone_start + drone_speed, ugly_start, ugly_start + ugly_speed)
+
+        assert hit.tolist() == [[Referee.is_collision(drone, ugly) for ugly in uglies] for drone in drones]
+        assert np.all((t >= 0) & (t <= 1) | ~hit) and np.all(np.isinf(t[~hit]))
+        # the same pairs in a batch of worlds
+        batch, _ = get_swept_collisions(np.stack([drone_start] * 3), np.stack([drone_start + drone_speed] * 3),
+                                        ugly_start, ugly_start + ugly_speed, properties.MONSTER_ATTACK_RADIUS)
+        assert (batch == hit).all()
@@ -0,0 +1,102 @@
+import numpy as np
+
+import properties
+from belief import Belief
+from danger_field import DangerField
+from decisions import Decision
+from game_math import Vector
+from match_runner import new_game
+from vector_referee import VectorReferee
+
+
+def is_caught(field: DangerField, start: tuple[float, float], end: tuple[float, float]) -> bool:
+    """
+    Exact check of relative motion against all uglies, without grid
+    """
+    for position, speed, radius in zip(field.position, field.speed, field.radius):
+        relative = position - start
+        speed = speed - (np.array(end) - start)
+        a = (speed ** 2).sum()
+        t = min(max(-(relative * speed).sum() / a, 0), 1) if a > 0 else 0
+        if ((relative + t * speed) ** 2).sum() <= radius ** 2:
+            return True
+    return False
+
+
+def get_ugly_state(seed: int):
+    state = new_game(seed)
+    for fish in state.fishes.values():
+        if fish.fish_id >= 16:
+            fish.last_seen, fish.speed = 0, Vector(270, -270) if fish.fish_id % 2 == 0 else Vector(0, 540)
+    return state
+
+
+def test_grid_agrees_with_exact_check_near_cell_borders():
+    rng = np.random.default_rng(0)
+    for seed in range(4):
+        state = get_ugly_state(seed)
+        state.fishes[16].last_seen = 1
+        field = DangerField(state)
+        # moves around uglies, most of them start near borders of cells
+        ugly = field.position[rng.integers(0, len(field.position), 400)]
+        start = ugly + rng.uniform(-2500, 2500, (400, 2))
+        start[::2] = np.round(start[::2] / DangerField.CELL) * DangerField.CELL + rng.uniform(-2, 2, (200, 2))
+        end = start + rng.uniform(-600, 600, (400, 2))
+
+        expected = [not is_caught(field, s, e) for s, e in zip(start, end)]
+        assert field.get_safe(start, end).tolist() == expected
+        assert [field.is_safe(tuple(s), tuple(e)) for s, e in zip(start.tolist(), end.tolist())] == expected
+        assert 0 < sum(expected) < len(expected)
+
+
+def test_far_cells_have_clearance():
+    # uglies are deep, moves near the surface are safe without exact check
+    field = DangerField(get_ugly_state(0))
+    assert (field.clearance[0] > properties.DRONE_MAX_SPEED).all()
+
+
+def test_hidden_ugly_is_inflated_by_particles():
+    state = new_game(0)
+    ugly = state.fishes[16]
+    belief = Belief(state, 32, seed=0)
+    for i, fish_id in enumerate(belief.fish_ids):
+        belief.position[i] = state.fishes[fish_id].position.x, state.fishes[fish_id].position.y
+    belief.position[belief.fish_ids.index(16), 0, 0] -= 1000
+
+    start = ugly.position.x - 1800, ugly.position.y
+    assert DangerField(state).is_safe(start, start)
+    field = DangerField(state, belief)
+    assert not field.is_safe(start, start)
+    assert field.radius[0] == properties.MONSTER_ATTACK_RADIUS + properties.MONSTER_ATTACK_SPEED + 1 + 1000
+    # one far particle of 32 is out of the most of them
+    assert DangerField(state, belief, 0.5).is_safe(start, start)
+
+
+def test_rollouts_with_field_are_exact():
+    rng, caught = np.random.default_rng(1), 0
+    for seed in range(4):
+        state = get_ugly_state(seed)
+        belief = Belief(state, 16, seed=seed)
+        belief.update(state)
+        # drones go to uglies and pass by them
+        plans = [[Decision(drone.drone_id, tuple(int(v) for v in rng.integers(0, properties.MAP_SIZE, 2)), False, 3)
+                  for drone in state.drones.values() if drone.player_id == 0] for _ in range(32)]
+        for drone in state.drones.values():
+            fish = state.fishes[16 + drone.drone_id % 2]
+            drone.position = Vector(fish.position.x + 700, fish.position.y)
+        world = belief.sample(state)
+        danger = DangerField(state, belief)
+        with_field = VectorReferee(world, len(plans), danger)
+        with_field.set_plans(plans)
+        without = VectorReferee(world, len(plans))
+        without.set_plans(plans)
+        for _ in range(2):
+            for referee in (with_field, without):
+                referee.remove_to_lost()
+                referee.update_drone()
+                referee.update_positions()
+                referee.update_speed()
+                referee.step += 1
+            assert (with_field.drone_emergency == without.drone_emergency).all()
+        caught += without.drone_emergency.sum()
+    assert caught > 0
@@ -0,0 +1,71 @@
+import random
+
+from decisions import Decision
+from game_input import GameReader
+from game_math import Vector
+from game_objects import BlipType, Drone, Fish
+from match_runner import Channel, format_initialize, format_turn, new_game
+from referee import Referee
+
+
+def test_turns_round_trip():
+    rng = random.Random(11)
+    state = new_game(11)
+    referee = Referee(state, True)
+    channel = Channel()
+    reader = GameReader(channel)
+    # data comes in pieces, tokens are cut between them
+    data = format_initialize(state)
+    for i in range(0, len(data), 7):
+        channel.write(data[i:i + 7])
+    read = reader.read_initialize()
+    assert sorted(read.fishes) == sorted(state.fishes)
+
+    for _ in range(30):
+        data = format_turn(state, 0)
+        for i in range(0, len(data), 7):
+            channel.write(data[i:i + 7])
+        read = reader.read_state(read)
+
+        assert read.score == state.score and read.scans == state.scans
+        for drone in state.drones.values():
+            other = read.drones[drone.drone_id]
+            assert (other.position, other.emergency, other.battery, other.scans) == \
+                   (drone.position, bool(drone.emergency), drone.battery, drone.scans)
+        for fish in read.fishes.values():
+            if fish.last_seen == 0:
+                assert (fish.position, fish.speed) == (state.fishes[fish.fish_id].position.round(),
+                                                       state.fishes[fish.fish_id].speed.round())
+        for drone in (drone for drone in read.drones.values() if drone.player_id == 0):
+            for fish in state.fishes.values():
+                position = state.drones[drone.drone_id].position
+                blip = drone.radar_blips[fish.fish_id]
+                assert (blip in (BlipType.TL, BlipType.TR)) == (fish.position.y < position.y)
+                assert (blip in (BlipType.TL, BlipType.BL)) == (fish.position.x < position.x)
+        assert sorted(read.fishes) == sorted(state.fishes)
+
+        referee.remove_to_lost()
+        referee.update_drone([Decision(drone_id, (rng.randrange(10000), rng.randrange(10000)), rng.random() < 0.3)
+                              for drone_id in state.drones])
+        referee.update_positions()
+        referee.update_speed()
+        referee.do_scan()
+        referee.do_report()
+        state.turn += 1
+
+
+def test_radar_blips_of_large_fish_ids():
+    state = new_game(0)
+    ugly = Fish(Drone.BLIPS + 8)
+    ugly.position, ugly.speed = Vector(100, 9000), Vector()
+    state.fishes[ugly.fish_id] = ugly
+    channel = Channel()
+    reader = GameReader(channel)
+    channel.write(format_initialize(state))
+    read = reader.read_initialize()
+    channel.write(format_turn(state, 0))
+    read = reader.read_state(read)
+
+    for drone in (drone for drone in read.drones.values() if drone.player_id == 0):
+        assert len(drone.radar_blips) == ugly.fish_id + 1
+        assert drone.radar_blips[ugly.fish_id] == BlipType.BL
@@ -0,0 +1,13 @@
+from belief import Belief
+from match_runner import Overrides, new_game
+
+
+def test_overrides_change_particles_of_belief():
+    with Overrides({'Belief.PARTICLES': 16}):
+        belief = Belief(new_game(0))
+    assert belief.position.shape[1] == 16
+    assert Belief(new_game(0)).position.shape[1] == Belief.PARTICLES
+
+
+def test_belief_is_repeated_by_seed():
+    assert (Belief(new_game(0), seed=1).position == Belief(new_game(0), seed=1).position).all()
@@ -0,0 +1,21 @@
+import random
+
+from match_runner import new_game
+from parallel import ParallelEvaluator
+from referee import Referee
+from test_vector_referee import random_plan
+from vector_referee import VectorReferee
+
+
+def test_parallel_equals_serial():
+    rng = random.Random(3)
+    state = new_game(3)
+    plans = [random_plan(rng, 30) for _ in range(7)] + [[]]
+    expected = [Referee.simulate(state, plan, 30) for plan in plans]
+    assert VectorReferee.simulate_batch(state, plans, 30).tolist() == expected
+
+    for batch in (True, False):
+        with ParallelEvaluator(state, 3, batch) as evaluator:
+            assert evaluator.evaluate(plans, 30).tolist() == expected
+            score, plan = evaluator.get_best(plans, 30)
+            assert score == max(expected) and plan is plans[expected.index(score)]
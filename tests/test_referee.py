@@ -0,0 +1,120 @@
+import properties
+from decisions import Decision
+from game_math import Vector
+from match_runner import new_game
+from referee import Referee
+from search import Search
+
+
+def play_turn(referee: Referee, plan: list[Decision], turn: int) -> None:
+    referee.remove_to_lost()
+    referee.update_drone(Decision.get_turn_decisions(plan, turn))
+    referee.update_positions()
+    referee.update_speed()
+    referee.do_scan()
+    referee.do_report()
+    referee.state.turn += 1
+
+
+def test_events_mode_is_exact():
+    for seed in range(5):
+        plan = Search(new_game(seed), seed).random_plan()
+        referee, fast = Referee(new_game(seed)), Referee(new_game(seed), True, True)
+        for turn in range(Search.HORIZON):
+            play_turn(referee, plan, turn)
+            play_turn(fast, plan, turn)
+            assert [(fish.position, fish.speed) for fish in referee.state.fishes.values()] == \
+                   [(fish.position, fish.speed) for fish in fast.state.fishes.values()]
+            assert referee.state.score == fast.state.score
+
+
+def get_drone_state():
+    """
+    New game with my drone 0 in the middle of the map and all fishes far from it
+    """
+    state = new_game(0)
+    for fish in state.fishes.values():
+        fish.position = Vector(fish.position.x, properties.MAP_SIZE - 1)
+    drone = state.drones[0]
+    drone.position = Vector(5000, 5000)
+    return state, drone
+
+
+def test_drone_speed_by_decision():
+    state, drone = get_drone_state()
+    drone.position = Vector(5000, 500)
+    assert Referee.get_drone_speed(drone, None) == Vector(0, -500)
+    assert Referee.get_drone_speed(drone, Decision(0, None)) == Vector(0, properties.DRONE_SINK_SPEED)
+    assert Referee.get_drone_speed(drone, Decision(0, (8000, 4500))) == Vector(360, 480)
+    drone.emergency = True
+    assert Referee.get_drone_speed(drone, Decision(0, (8000, 4500))) == \
+        Vector(0, -properties.DRONE_EMERGENCY_SPEED)
+
+
+def test_drone_light_drains_battery():
+    state, drone = get_drone_state()
+    referee = Referee(state)
+    referee.update_drone([Decision(0, (5000, 5000), True)])
+    assert (drone.battery, drone.light_radius) == (properties.MAX_BATTERY - properties.BATTERY_DRAIN,
+                                                   properties.LIGHT_SCAN_RADIUS)
+    referee.update_drone([Decision(0, (5000, 5000))])
+    assert (drone.battery, drone.light_radius) == (properties.MAX_BATTERY - properties.BATTERY_DRAIN
+                                                   + properties.BATTERY_RECHARGE, properties.DARK_SCAN_RADIUS)
+    drone.battery = properties.BATTERY_DRAIN - 1
+    referee.update_drone([Decision(0, (5000, 5000), True)])
+    assert not drone.lighting and drone.battery == properties.BATTERY_DRAIN
+
+
+def test_caught_drone_loses_scans_and_is_repaired_on_surface():
+    state, drone = get_drone_state()
+    drone.scans = 0b110000
+    ugly = state.fishes[16]
+    ugly.position, ugly.speed = Vector(5000, 5400), Vector()
+    referee = Referee(state)
+    referee.update_drone([Decision(0, (5000, 6000))])
+    assert drone.emergency and drone.scans == 0 and drone.position == Vector(5000, 5600)
+
+    drone.position = Vector(5000, 200)
+    referee.update_drone([Decision(0, (5000, 6000))])
+    assert not drone.emergency and drone.position == Vector(5000, 0)
+
+
+def test_drone_stays_in_map():
+    state, drone = get_drone_state()
+    drone.position = Vector(100, 5000)
+    Referee(state).update_drone([Decision(0, (-1000, 5000))])
+    assert drone.position == Vector(0, 5000)
+
+
+def test_collision_during_turn():
+    state, drone = get_drone_state()
+    ugly = state.fishes[16]
+    radius = properties.MONSTER_ATTACK_RADIUS
+
+    ugly.position, ugly.speed, drone.speed = Vector(5000 + radius, 5000), Vector(), Vector()
+    assert Referee.is_collision(drone, ugly)
+    # both move toward each other, they meet in the middle of the turn
+    ugly.position, ugly.speed, drone.speed = Vector(6500, 5000), Vector(-600, 0), Vector(600, 0)
+    assert Referee.is_collision(drone, ugly)
+    # ugly passes by the drone
+    ugly.position, ugly.speed, drone.speed = Vector(5400, 6000), Vector(0, -540), Vector(0, 600)
+    assert Referee.is_collision(drone, ugly)
+    ugly.position, ugly.speed, drone.speed = Vector(7000, 5000), Vector(-540, 0), Vector(600, 0)
+    assert not Referee.is_collision(drone, ugly)
+    ugly.position, ugly.speed, drone.speed = Vector(5600, 5000), Vector(540, 0), Vector()
+    assert not Referee.is_collision(drone, ugly)
+
+
+def test_ugly_attacks_drone_in_light():
+    state, drone = get_drone_state()
+    ugly = state.fishes[16]
+    ugly.position, ugly.speed = Vector(5000, 5000 + properties.DARK_SCAN_RADIUS), Vector(100, 0)
+    referee = Referee(state)
+    assert referee.get_ugly_speed(ugly) == Vector(0, -properties.MONSTER_ATTACK_SPEED)
+
+    # broken drone is not attacked, ugly keeps its slow speed
+    drone.emergency = True
+    assert referee.get_ugly_speed(ugly) == Vector(100, 0)
+    drone.emergency = False
+    drone.light_radius = properties.DARK_SCAN_RADIUS - 1
+    assert referee.get_ugly_speed(ugly) == Vector(100, 0)
@@ -0,0 +1,64 @@
+import io
+import random
+
+import properties
+from game_input import GameReader
+from game_objects import Fish
+from match_runner import format_initialize, new_game
+from scan_mask import ScoreTable, fish_bit, iter_fish_ids
+
+
+def get_score(fishes: list, saved: set[int], scans: set[int], bonus: bool) -> int:
+    """
+    Score of report by sets of fish ids, as the referee counted it before scan masks
+    """
+    koef = 2 if bonus else 1
+    after = saved | scans
+    score = sum(properties.REWARDS[fish.kind] for fish in fishes if fish.fish_id in scans) * koef
+    for group in {fish.color for fish in fishes if fish.fish_id in scans}:
+        if all(fish.fish_id in after for fish in fishes if fish.color == group):
+            score += properties.REWARDS_COLOR * koef
+    for group in {fish.kind for fish in fishes if fish.fish_id in scans}:
+        if all(fish.fish_id in after for fish in fishes if fish.kind == group):
+            score += properties.REWARDS_KIND * koef
+    return score
+
+
+def test_fish_ids_round_trip():
+    rng = random.Random(6)
+    for _ in range(100):
+        fish_ids = sorted(rng.sample(range(64), rng.randint(0, 20)))
+        assert list(iter_fish_ids(sum(fish_bit(fish_id) for fish_id in fish_ids))) == fish_ids
+
+
+def test_score_table_equals_sets():
+    fishes = [fish for fish in new_game(0).fishes.values() if fish.kind in properties.REWARDS]
+    table = ScoreTable(fishes)
+    rng = random.Random(6)
+    for _ in range(500):
+        saved = {fish.fish_id for fish in fishes if rng.random() < 0.4}
+        scans = {fish.fish_id for fish in fishes if fish.fish_id not in saved and rng.random() < 0.5}
+        bonus = rng.random() < 0.5
+        mask = sum(fish_bit(fish_id) for fish_id in saved), sum(fish_bit(fish_id) for fish_id in scans)
+        assert table.get_score(*mask, bonus) == get_score(fishes, saved, scans, bonus)
+
+
+def test_wide_ids_are_scored_without_table():
+    fishes = [fish for fish in new_game(0).fishes.values() if fish.kind in properties.REWARDS]
+    wide = [Fish(fish.fish_id * 3, fish.color, fish.kind) for fish in fishes]
+    table = ScoreTable(wide)
+    rng = random.Random(7)
+    for _ in range(200):
+        saved = {fish.fish_id for fish in wide if rng.random() < 0.4}
+        scans = {fish.fish_id for fish in wide if fish.fish_id not in saved and rng.random() < 0.5}
+        bonus = rng.random() < 0.5
+        mask = sum(fish_bit(fish_id) for fish_id in saved), sum(fish_bit(fish_id) for fish_id in scans)
+        assert table.get_score(*mask, bonus) == get_score(wide, saved, scans, bonus)
+        assert table.get_max_score(*mask, 0) == ScoreTable(fishes).get_max_score(
+            *(sum(fish_bit(fish_id // 3) for fish_id in ids) for ids in (saved, scans)), 0)
+
+
+def test_table_is_built_with_initial_state():
+    assert new_game(0).score_table is not None
+    reader = GameReader(io.BytesIO(format_initialize(new_game(0))))
+    assert reader.read_initialize().score_table is not None
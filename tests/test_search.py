@@ -0,0 +1,14 @@
+from match_runner import new_game
+from search import Search
+
+
+def test_best_plan_of_final_state_is_kept():
+    search = Search(new_game(0), 0)
+    search.evaluate([[]])
+    score, _, _, key, final = search.population[0]
+    assert final is not None
+
+    search = Search(new_game(0), 0)
+    search.population = [(score - 1, 3, [], key ^ 1, final)]
+    search.evaluate([[]])
+    assert [(item[0], item[3]) for item in search.population] == [(score, key)]
@@ -0,0 +1,25 @@
+import random
+
+from game_math import Vector
+from spatial_index import SpatialGrid
+
+
+def test_queries_equal_brute_force():
+    rng = random.Random(5)
+    entities = {key: Vector(rng.randrange(-500, 10500), rng.randrange(-500, 10500)) for key in range(40)}
+    grid = SpatialGrid.build(entities.items())
+
+    # entities are moved, one leaves the grid
+    for key in range(0, 40, 3):
+        entities[key] = Vector(rng.randrange(10000), rng.randrange(10000))
+        grid.update(key, entities[key])
+    grid.remove(1)
+    del entities[1]
+    assert len(grid) == len(entities) and 1 not in grid
+
+    for _ in range(200):
+        center, r = Vector(rng.randrange(10000), rng.randrange(10000)), rng.choice((600, 1400, 2000))
+        expected = sorted(key for key, position in entities.items() if position.in_range_vec(center, r))
+        assert sorted(grid.query(center, r)) == expected
+        assert sorted(grid.get_closest(center, r), key=lambda v: (v.x, v.y)) == sorted(
+            center.get_closest_in_range(entities.values(), r), key=lambda v: (v.x, v.y))
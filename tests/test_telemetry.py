@@ -0,0 +1,37 @@
+import io
+
+from telemetry import NULL_TIMER, Telemetry
+
+
+def test_turn_line_and_summary():
+    stream = io.StringIO()
+    telemetry = Telemetry(True, stream)
+    for turn, rollouts in ((1, 10), (2, 30)):
+        telemetry.add_time('search', 0.002)
+        telemetry.add_time('search', 0.001)
+        telemetry.add('rollouts', rollouts)
+        telemetry.end_turn(turn)
+    telemetry.summary()
+
+    lines = stream.getvalue().splitlines()
+    assert lines[:2] == ['T1 search 3.00 rollouts 10', 'T2 search 3.00 rollouts 30']
+    assert lines[2] == 'Summary of 2 turns (mean/min/max)'
+    assert lines[3:] == ['  search 3/3/3', '  rollouts 20/10/30']
+
+
+def test_timer_adds_elapsed_time():
+    telemetry = Telemetry(True, io.StringIO())
+    with telemetry.timer('parse'):
+        sum(range(1000))
+    assert 'parse' in telemetry.times and telemetry.values['parse'] > 0
+
+
+def test_switched_off_telemetry_is_silent():
+    stream = io.StringIO()
+    telemetry = Telemetry(False, stream)
+    assert telemetry.timer('search') is NULL_TIMER
+    telemetry.add('rollouts', 5)
+    telemetry.set_time('slack', 0.01)
+    telemetry.end_turn(1)
+    telemetry.summary()
+    assert telemetry.values == {} and stream.getvalue() == ''
@@ -0,0 +1,45 @@
+import time
+
+import properties
+from game_math import Vector
+from match_runner import new_game
+from time_manager import TimeManager
+
+BUDGET = 0.05
+
+
+def get_search_time(manager: TimeManager, used: float = 0.0, ugly_close: bool = False) -> float:
+    """
+    Search time of turn 2 which used time before the search started
+    """
+    state = new_game(0)
+    state.turn = 2
+    if ugly_close:
+        drone = state.drones[0]
+        ugly = next(fish for fish in state.fishes.values() if fish.fish_id >= 16)
+        ugly.position = drone.position + Vector(0, properties.MONSTER_ATTACK_RADIUS * 2)
+    state.time = time.perf_counter() - used
+    return manager.get_deadline(state) - time.perf_counter()
+
+
+def test_search_gets_most_of_budget():
+    manager = TimeManager(properties.FIRST_TURN_TIME, BUDGET)
+    assert get_search_time(manager) > BUDGET * 0.7
+    assert get_search_time(manager, ugly_close=True) > BUDGET * 0.85
+
+
+def test_used_time_is_paid_from_budget():
+    manager = TimeManager(properties.FIRST_TURN_TIME, BUDGET)
+    margin = manager.get_margin(BUDGET)
+    assert get_search_time(manager, 0.02, True) <= BUDGET - 0.02 - margin
+    assert get_search_time(manager, BUDGET) <= 0
+
+
+def test_margin_follows_lateness():
+    manager = TimeManager(properties.FIRST_TURN_TIME, BUDGET)
+    for lateness in [0.002, 0.003] * TimeManager.PRIOR_TURNS:
+        manager.deadline, manager.observed = 0.0, True
+        manager.end_turn(lateness)
+    assert 0.003 < manager.get_margin(BUDGET) < 0.005
+    # search gets the budget without the observed lateness
+    assert get_search_time(manager, ugly_close=True) > BUDGET - 0.006
@@ -0,0 +1,73 @@
+import pytest
+
+from match_runner import new_game
+from transposition import Zobrist, TranspositionTable
+from vector_referee import VectorReferee
+
+
+def test_deeper_entry_of_generation_is_kept():
+    table = TranspositionTable(4)
+    assert table.put(1, 10, 5)
+    assert not table.put(5, 20, 3)
+    assert table.get(1, 5) == 10
+    assert table.get(5) is None
+
+
+def test_same_or_deeper_entry_replaces():
+    table = TranspositionTable(4)
+    table.put(1, 10, 5)
+    assert table.put(5, 20, 5)
+    assert table.get(1) is None
+    assert table.get(5, 5) == 20
+
+
+def test_entry_of_old_generation_is_replaced():
+    table = TranspositionTable(4)
+    table.put(1, 10, 5)
+    table.new_generation()
+    assert table.put(5, 20, 1)
+    assert table.get(5, 1) == 20
+
+
+def test_entry_is_not_used_for_deeper_search():
+    table = TranspositionTable(4)
+    table.put(1, 10, 3)
+    assert table.get(1, 4) is None
+    assert table.get(1, 3) == 10
+
+
+def test_hash_of_worlds_equals_hash_of_state():
+    zobrist = Zobrist()
+    for seed in range(5):
+        state = new_game(seed)
+        referee = VectorReferee(state, 3)
+        assert all(int(h) == zobrist.hash_state(state) for h in zobrist.hash_worlds(referee))
+
+
+def test_upper_bound_is_used_only_under_threshold():
+    table = TranspositionTable(4)
+    table.put(1, 10, 5, upper=True)
+    assert table.get(1, 5) is None
+    assert table.get(1, 5, 9) is None
+    assert table.get(1, 5, 10) == 10
+
+
+def test_upper_bound_does_not_replace_exact_score():
+    table = TranspositionTable(4)
+    table.put(1, 10, 5)
+    assert not table.put(1, 8, 5, upper=True)
+    assert table.get(1, 5) == 10
+    assert table.put(1, 8, 6, upper=True)
+    assert table.put(1, 7, 6)
+    assert table.get(1, 6) == 7
+
+
+def test_ids_out_of_keys_are_rejected():
+    state = new_game(0)
+    assert Zobrist.get_limits(state) == (4, max(state.fishes) + 1)
+    zobrist = Zobrist(*Zobrist.get_limits(state))
+    assert zobrist.hash_state(state) == int(zobrist.hash_worlds(VectorReferee(state))[0])
+    with pytest.raises(ValueError):
+        Zobrist(4, 16).hash_state(state)
+    with pytest.raises(ValueError):
+        Zobrist(2).hash_worlds(VectorReferee(state))
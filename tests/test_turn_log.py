@@ -0,0 +1,29 @@
+import io
+
+from turn_log import RecordType, TurnLog, TurnLogWriter
+
+
+def write_game(path: str, data: bytes, output: str) -> None:
+    with TurnLogWriter(path) as log:
+        stream = log.tee(io.BytesIO(data))
+        while stream.read(4):
+            pass
+        log.write_output(output)
+
+
+def test_records_round_trip(tmp_path):
+    path = str(tmp_path / 'game.log')
+    write_game(path, b'12\n4 0 0\n', 'WAIT 0')
+    with TurnLog(path) as log:
+        assert log.get_input() == b'12\n4 0 0\n'
+        assert log.get_outputs() == ['WAIT 0']
+        assert [record_type for record_type, _ in log][-1] == RecordType.OUTPUT
+
+
+def test_log_of_the_next_game_replaces_previous(tmp_path):
+    path = str(tmp_path / 'game.log')
+    write_game(path, b'first\n', 'WAIT 1')
+    write_game(path, b'second\n', 'WAIT 0')
+    with TurnLog(path, use_mmap=False) as log:
+        assert log.get_input() == b'second\n'
+        assert log.get_outputs() == ['WAIT 0']
@@ -0,0 +1,55 @@
+import random
+
+import properties
+from decisions import Decision
+from match_runner import new_game
+from referee import Referee
+from vector_referee import VectorReferee
+
+
+def random_plan(rng: random.Random, turns: int = properties.MAX_TURN) -> list[Decision]:
+    """
+    Plan of all drones: moves to random points and waits, light is on sometimes
+    """
+    plan = []
+    for drone_id in range(4):
+        passed = 0
+        while passed < turns:
+            length = rng.randint(1, 10)
+            position = None if rng.random() < 0.2 else (rng.randrange(properties.MAP_SIZE),
+                                                        rng.randrange(properties.MAP_SIZE))
+            plan.append(Decision(drone_id, position, rng.random() < 0.4, length))
+            passed += length
+    return plan
+
+
+def test_simulate_equals_referee():
+    rng = random.Random(1)
+    for seed in range(6):
+        state = new_game(seed)
+        for depth in (20, None):
+            plan = random_plan(rng)
+            assert VectorReferee.simulate(state, plan, depth) == Referee.simulate(state, plan, depth)
+
+
+def test_batch_equals_referee():
+    rng = random.Random(2)
+    for seed in range(4):
+        state = new_game(seed)
+        plans = [random_plan(rng, rng.randint(1, 40)) for _ in range(8)] + [[]]
+        expected = [Referee.simulate(state, plan, 40) for plan in plans]
+        assert VectorReferee.simulate_batch(state, plans, 40).tolist() == expected
+
+
+def test_threshold_cut_is_admissible():
+    rng = random.Random(19)
+    for seed in range(3):
+        state = new_game(seed)
+        plans = [random_plan(rng, 30) for _ in range(8)]
+        scores = VectorReferee.simulate_batch(state, plans, 30).tolist()
+        for threshold in (min(scores), sorted(scores)[4], max(scores), 100):
+            for results in (VectorReferee.simulate_batch(state, plans, 30, threshold).tolist(),
+                            [Referee.simulate(state, plan, 30, threshold) for plan in plans]):
+                for score, result in zip(scores, results):
+                    # world which can beat threshold is simulated to the end, else its upper bound is returned
+                    assert result == score if score > threshold else score <= result <= threshold
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import time
+from collections import deque
+from math import sqrt
+
+import properties
+from game_objects import GameState, FishKind
+from referee import Referee
+from telemetry import telemetry
+
+
+class TimeManager:
+    """
+    Time of the bot's response on every turn.
+    Search gets the time left of the turn without the margin: all of it on dangerous turns,
+    a part of it on calm turns and a small part when the result of the game can't change.
+    Parsing and the belief update are paid from the budget before the search starts.
+    The margin is learned from how late the answer was after the search deadline.
+    Search sizes every batch by the time left, so the margin covers only its overrun and the output
+    """
+    TIME_MARGIN = 0.005
+    TIME_MARGIN_RATE = 0.1
+    MIN_MARGIN = 0.001
+    MAX_MARGIN_RATE = 0.5
+    JITTER_SIGMAS = 3
+    HISTORY = 30
+    PRIOR_TURNS = 10
+    CALM_RATE = 0.8
+    DECIDED_RATE = 0.1
+    DANGER_TURNS = 2
+
+    first_turn_time: float
+    turn_time: float
+    deadline: float | None
+    observed: bool
+    lateness: deque[float]
+
+    def __init__(self, first_turn_time: float = properties.FIRST_TURN_TIME, turn_time: float = properties.TURN_TIME):
+        """
+        :param first_turn_time: Time for response on the first turn
+        :param turn_time: Time for response on other turns
+        """
+        self.first_turn_time = first_turn_time
+        self.turn_time = turn_time
+        self.deadline = None
+        self.observed = False
+        self.lateness = deque(maxlen=TimeManager.HISTORY)
+
+    def get_budget(self, state: GameState) -> float:
+        """
+        Response time of the turn
+        """
+        return self.first_turn_time if state.turn == 1 else self.turn_time
+
+    def get_time_limit(self, state: GameState) -> float:
+        """
+        Time (perf_counter) when the response time of the turn is over, measured from the arrival of the turn's input
+        """
+        return (state.time or time.perf_counter()) + self.get_budget(state)
+
+    def get_margin(self, budget: float) -> float:
+        """
+        Time between search deadline and time limit: observed lateness with its jitter.
+        Until lateness of PRIOR_TURNS is observed, margin is not less than the prior,
+        which is limited by a part of budget for short budgets of local games
+        :param budget: Response time of the turn
+        """
+        margin = TimeManager.MIN_MARGIN
+        if len(self.lateness) < TimeManager.PRIOR_TURNS:
+            margin = max(margin, min(TimeManager.TIME_MARGIN, budget * TimeManager.TIME_MARGIN_RATE))
+        if len(self.lateness) >= 2:
+            mean = sum(self.lateness) / len(self.lateness)
+            deviation = sqrt(sum((value - mean) ** 2 for value in self.lateness) / (len(self.lateness) - 1))
+            margin = max(margin, mean + TimeManager.JITTER_SIGMAS * deviation)
+        return min(margin, budget * TimeManager.MAX_MARGIN_RATE)
+
+    def get_rate(self, state: GameState) -> float:
+        """
+        Part of time for search: all of it on the first turn and near ugly
+        """
+        referee = Referee(state)
+        low, high = referee.get_score_bounds()
+        if referee.is_game_over() or low == high:
+            return TimeManager.DECIDED_RATE
+        if state.turn == 1 or TimeManager.is_danger(state):
+            return 1
+        return TimeManager.CALM_RATE
+
+    @staticmethod
+    def is_danger(state: GameState) -> bool:
+        """
+        Known ugly can reach my drone in DANGER_TURNS turns
+        """
+        reach = properties.MONSTER_ATTACK_RADIUS \
+            + TimeManager.DANGER_TURNS * (properties.MONSTER_ATTACK_SPEED + properties.DRONE_MAX_SPEED)
+        return any(fish.position.in_range_vec(drone.position, reach)
+                   for fish in state.fishes.values() if fish.kind == FishKind.ANGLER and fish.speed is not None
+                   for drone in state.drones.values() if drone.player_id == 0 and not drone.emergency)
+
+    def get_deadline(self, state: GameState) -> float:
+        """
+        Time (perf_counter) when the search must be over, time of the turn already used is not shared by rate
+        """
+        budget = self.get_budget(state)
+        now = time.perf_counter()
+        margin, rate = self.get_margin(budget), self.get_rate(state)
+        telemetry.set_time('margin', margin)
+        telemetry.set('time_rate', rate)
+        self.deadline = now + max(self.get_time_limit(state) - margin - now, 0) * rate
+        # the first turn is too different from others
+        self.observed = state.turn != 1
+        return self.deadline
+
+    def end_turn(self, end: float) -> None:
+        """
+        Answer was sent, its lateness after the search deadline is observed
+        :param end: Time (perf_counter) of the answer
+        """
+        if self.deadline is not None and self.observed:
+            self.lateness.append(end - self.deadline)
+        self.deadline = None
@@ -0,0 +1,181 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import sqrt
+
+import properties
+from match_runner import Overrides, play_match
+
+
+class GameRecord:
+    """
+    Result of one tournament game from the point of view of bot A
+    """
+    seed: int
+    swap: bool
+    score_a: int
+    score_b: int
+    turns: int
+    time: float
+    turn_time_a: float
+    turn_time_b: float
+    max_turn_time_a: float
+    max_turn_time_b: float
+
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+    @property
+    def key(self) -> tuple[int, bool]:
+        return self.seed, self.swap
+
+    @property
+    def points(self) -> float:
+        """
+        1 for win of A, 0.5 for draw
+        """
+        return 1 if self.score_a > self.score_b else 0.5 if self.score_a == self.score_b else 0
+
+    def to_json(self) -> str:
+        return json.dumps(self.__dict__)
+
+    @staticmethod
+    def from_json(line: str) -> GameRecord:
+        return GameRecord(**json.loads(line))
+
+
+def play_game(seed: int, swap: bool, values_a: dict, values_b: dict, first_turn_time: float,
+              turn_time: float) -> GameRecord:
+    """
+    Worker task: one game, bot A plays as player 1 if swap
+    """
+    overrides = (Overrides(values_b), Overrides(values_a)) if swap else (Overrides(values_a), Overrides(values_b))
+    result = play_match(seed, first_turn_time, turn_time, overrides)
+    a, b = (1, 0) if swap else (0, 1)
+    return GameRecord(seed=seed, swap=swap, score_a=result.score[a], score_b=result.score[b], turns=result.turns,
+                      time=result.time, turn_time_a=result.turn_times[a], turn_time_b=result.turn_times[b],
+                      max_turn_time_a=result.max_turn_times[a], max_turn_time_b=result.max_turn_times[b])
+
+
+def load_records(path: str) -> list[GameRecord]:
+    """
+    Records of results file, a line cut by interrupted run is skipped
+    """
+    records = []
+    if os.path.exists(path):
+        with open(path) as file:
+            for line in file:
+                try:
+                    records.append(GameRecord.from_json(line))
+                except (ValueError, TypeError):
+                    pass
+    return records
+
+
+def wilson_interval(points: float, games: int, z: float = 1.96) -> tuple[float, float]:
+    """
+    Confidence interval of win rate, draws are counted as half of win
+    """
+    if not games:
+        return 0, 1
+    rate = points / games
+    center = (rate + z * z / (2 * games)) / (1 + z * z / games)
+    spread = z * sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return center - spread, center + spread
+
+
+def percentile(values: list[float], rate: float) -> float:
+    values = sorted(values)
+    return values[min(int(rate * len(values)), len(values) - 1)] if values else 0
+
+
+def report(records: list[GameRecord]) -> None:
+    """
+    Win rate of A with 95% interval, game and response times
+    """
+    games = len(records)
+    wins = sum(record.points == 1 for record in records)
+    draws = sum(record.points == 0.5 for record in records)
+    points = sum(record.points for record in records)
+    low, high = wilson_interval(points, games)
+
+    print(f"{games} games: A wins {wins}, draws {draws}, loses {games - wins - draws}")
+    print(f"A win rate {points / max(games, 1):.3f} (95% {low:.3f} - {high:.3f})")
+    print(f"Score A {sum(record.score_a for record in records) / max(games, 1):.1f} "
+          f"B {sum(record.score_b for record in records) / max(games, 1):.1f}")
+    print(f"Game time mean {sum(record.time for record in records) / max(games, 1):.1f} s "
+          f"p95 {percentile([record.time for record in records], 0.95):.1f} s")
+    for name in ('a', 'b'):
+        turn_times = [getattr(record, f'turn_time_{name}') for record in records]
+        max_times = [getattr(record, f'max_turn_time_{name}') for record in records]
+        print(f"Turn time {name.upper()} mean {sum(turn_times) / max(games, 1) * 1000:.1f} ms "
+              f"p95 of max {percentile(max_times, 0.95) * 1000:.1f} ms max {max(max_times, default=0) * 1000:.1f} ms")
+
+
+def parse_values(items: list[str]) -> dict[str, object]:
+    """
+    Constants from 'Search.HORIZON=15' items, values are JSON or strings
+    """
+    values = {}
+    for item in items or []:
+        name, _, value = item.partition('=')
+        try:
+            values[name] = json.loads(value)
+        except ValueError:
+            values[name] = value
+    return values
+
+
+def run(path: str, games: int, seed: int, values_a: dict, values_b: dict, workers: int = None,
+        first_turn_time: float = properties.FIRST_TURN_TIME, turn_time: float = properties.TURN_TIME) -> None:
+    """
+    Play games which are not in results file yet, every seed is played twice with swapped sides.
+    Results are appended to file as soon as game is over
+    :param path: Results file (JSON lines)
+    :param games: Number of seeds
+    :param seed: The first seed
+    :param values_a: Constants of bot A
+    :param values_b: Constants of bot B
+    :param workers: Number of processes, default is number of cores
+    :param first_turn_time: Time of bots for the first turn
+    :param turn_time: Time of bots for other turns
+    """
+    # check names before the start of workers
+    Overrides(values_a), Overrides(values_b)
+
+    done = {record.key for record in load_records(path)}
+    tasks = [(game_seed, swap) for game_seed in range(seed, seed + games) for swap in (False, True)
+             if (game_seed, swap) not in done]
+    print(f"{len(done)} games done, {len(tasks)} to play")
+
+    with open(path, 'a') as file, ProcessPoolExecutor(workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(play_game, game_seed, swap, values_a, values_b, first_turn_time, turn_time)
+                   for game_seed, swap in tasks]
+        for number, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            file.write(record.to_json() + '\n')
+            file.flush()
+            print(f"[{number}/{len(tasks)}] seed {record.seed}{' swapped' if record.swap else ''}: "
+                  f"A {record.score_a} - B {record.score_b}, {record.time:.1f} s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tournament of bot A against bot B with different constants")
+    parser.add_argument('--out', default='tournament.jsonl', help="Results file, existing games are skipped")
+    parser.add_argument('--games', type=int, default=100, help="Number of seeds, both sides are played")
+    parser.add_argument('--seed', type=int, default=0, help="The first seed")
+    parser.add_argument('--a', nargs='*', help="Constants of bot A, e.g. Search.HORIZON=15")
+    parser.add_argument('--b', nargs='*', help="Constants of bot B")
+    parser.add_argument('--workers', type=int, help="Number of processes, default is number of cores")
+    parser.add_argument('--turn-time', type=float, default=properties.TURN_TIME, help="Bot time per turn")
+    parser.add_argument('--first-turn-time', type=float, default=properties.FIRST_TURN_TIME,
+                        help="Bot time for the first turn")
+    parser.add_argument('--report', action='store_true', help="Only report results file")
+    args = parser.parse_args()
+
+    if not args.report:
+        run(args.out, args.games, args.seed, parse_values(args.a), parse_values(args.b), args.workers,
+            args.first_turn_time, args.turn_time)
+    report(load_records(args.out))
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import numpy as np
+
+import properties
+from game_objects import GameState, Drone
+from scan_mask import iter_fish_ids
+
+
+class Zobrist:
+    """
+    Zobrist keys of search states: drone cells, battery, emergency, drone and saved scan masks, turn.
+    Fishes are not hashed, they follow from the turn and the root state of search.
+    Keys are made for ids of drones and fishes under the given limits
+    """
+    CELL = 200
+    DRONES = 8
+    FISHES = 64
+
+    __cells: int
+    drones: int
+    fishes: int
+    __position: np.ndarray
+    __battery: np.ndarray
+    __emergency: np.ndarray
+    __scans: np.ndarray
+    __saved: np.ndarray
+    __turn: np.ndarray
+
+    def __init__(self, drones: int = DRONES, fishes: int = FISHES, seed: int = 0):
+        """
+        :param drones: Limit of drone ids
+        :param fishes: Limit of fish ids
+        :param seed: Seed of keys, hashes are comparable only for the same seed
+        """
+        rng = np.random.default_rng(seed)
+        self.__cells = (properties.MAP_SIZE - 1) // Zobrist.CELL + 1
+        self.drones = drones
+        self.fishes = fishes
+
+        def keys(*shape: int) -> np.ndarray:
+            return rng.integers(np.iinfo(np.uint64).max, size=shape, dtype=np.uint64, endpoint=True)
+
+        self.__position = keys(drones, self.__cells * self.__cells)
+        self.__battery = keys(drones, properties.MAX_BATTERY + 1)
+        self.__emergency = keys(drones)
+        self.__scans = keys(drones, fishes)
+        self.__saved = keys(2, fishes)
+        self.__turn = keys(properties.MAX_TURN + 2)
+
+    def get_cell(self, x: float, y: float) -> int:
+        """
+        Cell of position, positions closer than CELL are often equal
+        """
+        column = min(max(int(x // Zobrist.CELL), 0), self.__cells - 1)
+        row = min(max(int(y // Zobrist.CELL), 0), self.__cells - 1)
+        return row * self.__cells + column
+
+    def hash_drone(self, drone: Drone) -> int:
+        drone_id = drone.drone_id
+        h = int(self.__position[drone_id, self.get_cell(drone.position.x, drone.position.y)])
+        h ^= int(self.__battery[drone_id, drone.battery])
+        if drone.emergency:
+            h ^= int(self.__emergency[drone_id])
+        for fish_id in iter_fish_ids(drone.scans):
+            h ^= int(self.__scans[drone_id, fish_id])
+        return h
+
+    def hash_saved(self, player_id: int, scans: int) -> int:
+        h = 0
+        for fish_id in iter_fish_ids(scans):
+            h ^= int(self.__saved[player_id, fish_id])
+        return h
+
+    def hash_turn(self, turn: int) -> int:
+        return int(self.__turn[min(turn, properties.MAX_TURN + 1)])
+
+    @staticmethod
+    def get_limits(state: GameState) -> tuple[int, int]:
+        """
+        Limits of drone and fish ids of state
+        """
+        return max(state.drones, default=-1) + 1, state.get_fish_limit()
+
+    def check(self, drones: int, fishes: int) -> None:
+        if drones > self.drones or fishes > self.fishes:
+            raise ValueError(f"Ids of {drones} drones and {fishes} fishes are out of "
+                             f"Zobrist keys for {self.drones} drones and {self.fishes} fishes")
+
+    def hash_state(self, state: GameState) -> int:
+        self.check(*Zobrist.get_limits(state))
+        h = self.hash_turn(state.turn)
+        for drone in state.drones.values():
+            h ^= self.hash_drone(drone)
+        for player_id, scans in enumerate(state.scans):
+            h ^= self.hash_saved(player_id, scans)
+        return h
+
+    def hash_worlds(self, referee) -> np.ndarray:
+        """
+        Hashes of all worlds of VectorReferee, equal to hash_state of the same states
+        :return: Array (worlds,) of uint64
+        """
+        zero = np.uint64(0)
+        drones, fishes = referee.drone_ids, referee.fish_ids
+        self.check(int(drones.max(initial=-1)) + 1, int(fishes.max(initial=-1)) + 1)
+        cells = np.clip(referee.drone_position // Zobrist.CELL, 0, self.__cells - 1).astype(np.int64)
+
+        keys = self.__position[drones, cells[..., 1] * self.__cells + cells[..., 0]]
+        keys ^= self.__battery[drones, referee.drone_battery]
+        keys ^= np.where(referee.drone_emergency, self.__emergency[drones], zero)
+        keys ^= np.bitwise_xor.reduce(np.where(referee.drone_scans, self.__scans[drones[:, None], fishes], zero),
+                                      axis=2)
+
+        h = np.bitwise_xor.reduce(keys, axis=1)
+        saved = np.where(referee.scans, self.__saved[:, fishes], zero)
+        h ^= np.bitwise_xor.reduce(saved, axis=(1, 2))
+        return h ^ self.__turn[min(referee.turn, properties.MAX_TURN + 1)]
+
+
+class TranspositionTable:
+    """
+    Bounded table of evaluations by hash.
+    Slot is replaced by an entry of the new generation (search turn) or by an evaluation with the same or deeper depth.
+    Evaluation of stopped rollout is only upper bound of score, it is used while it is not above the threshold
+    """
+    SIZE = 1 << 14
+
+    __mask: int
+    __keys: list[int | None]
+    __scores: list[int]
+    __depths: list[int]
+    __upper: list[bool]
+    __generations: list[int]
+    generation: int
+    hits: int
+    stores: int
+
+    def __init__(self, size: int = SIZE):
+        """
+        :param size: Number of slots, power of two
+        """
+        self.__mask = size - 1
+        self.__keys = [None] * size
+        self.__scores = [0] * size
+        self.__depths = [0] * size
+        self.__upper = [False] * size
+        self.__generations = [0] * size
+        self.generation = 0
+        self.hits = 0
+        self.stores = 0
+
+    def __len__(self) -> int:
+        return sum(key is not None for key in self.__keys)
+
+    def new_generation(self) -> None:
+        """
+        Entries of previous generations are replaced first
+        """
+        self.generation += 1
+
+    def get(self, key: int, depth: int = 0, threshold: int = None) -> int | None:
+        """
+        Score of key evaluated at least to depth, else None
+        :param threshold: Upper bound is returned only if it is not above threshold, so the exact score isn't either
+        """
+        index = key & self.__mask
+        if self.__keys[index] == key and self.__depths[index] >= depth:
+            if self.__upper[index] and (threshold is None or self.__scores[index] > threshold):
+                return None
+            self.hits += 1
+            self.__generations[index] = self.generation
+            return self.__scores[index]
+        return None
+
+    def put(self, key: int, score: int, depth: int = 0, upper: bool = False) -> bool:
+        """
+        Store evaluation of key
+        :param upper: Score is upper bound, exact score of the same key and depth is kept
+        :return: It was stored
+        """
+        index = key & self.__mask
+        if self.__keys[index] is not None and self.__keys[index] != key \
+                and self.__generations[index] == self.generation and self.__depths[index] > depth:
+            return False
+        if upper and self.__keys[index] == key and not self.__upper[index] and self.__depths[index] >= depth:
+            return False
+
+        self.__keys[index] = key
+        self.__scores[index] = score
+        self.__depths[index] = depth
+        self.__upper[index] = upper
+        self.__generations[index] = self.generation
+        self.stores += 1
+        return True
@@ -0,0 +1,159 @@
+from __future__ import annotations
+import mmap
+import struct
+from enum import Enum
+from typing import BinaryIO, Iterator
+
+HEADER = b'FCLOG\x01'
+RECORD = struct.Struct('<BI')
+
+
+class RecordType(Enum):
+    INPUT, OUTPUT = range(1, 3)
+
+
+class TurnLogWriter:
+    """
+    Binary log of one game: raw referee input as it was read and bot output of every turn.
+    Record is a type byte, payload length (uint32) and payload
+    """
+    __file: BinaryIO
+
+    def __init__(self, path: str):
+        """
+        :param path: Log file, it is replaced: log of the previous game would be read as part of this one
+        """
+        self.__file = open(path, 'wb')
+        self.__file.write(HEADER)
+
+    def __enter__(self) -> TurnLogWriter:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.__file.close()
+
+    def write(self, record_type: RecordType, payload: bytes) -> None:
+        self.__file.write(RECORD.pack(record_type.value, len(payload)))
+        self.__file.write(payload)
+
+    def write_input(self, data: bytes) -> None:
+        self.write(RecordType.INPUT, data)
+
+    def write_output(self, text: str) -> None:
+        """
+        Output ends the turn, so the log is flushed: a crashed game keeps all played turns
+        """
+        self.write(RecordType.OUTPUT, text.encode())
+        self.__file.flush()
+
+    def tee(self, stream: BinaryIO) -> TeeStream:
+        """
+        Stream which records everything read from stream
+        """
+        return TeeStream(stream, self)
+
+
+class TeeStream:
+    """
+    Binary stream wrapper, every chunk read is written to log as input record
+    """
+    __stream: BinaryIO
+    __log: TurnLogWriter
+
+    def __init__(self, stream: BinaryIO, log: TurnLogWriter):
+        self.__stream = stream
+        self.__log = log
+
+    def read1(self, size: int = -1) -> bytes:
+        data = getattr(self.__stream, 'read1', self.__stream.read)(size)
+        if data:
+            self.__log.write_input(data)
+        return data
+
+    read = read1
+
+
+class TurnLog:
+    """
+    Reader of turn log. With memory mapping records are slices of the mapped file,
+    so large collections of logs are replayed without reading them into memory at once
+    """
+    __file: BinaryIO
+    __data: mmap.mmap | bytes
+
+    def __init__(self, path: str, use_mmap: bool = True):
+        """
+        :param path: Log file
+        :param use_mmap: Map file into memory, else read it
+        """
+        self.__file = open(path, 'rb')
+        self.__data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ) if use_mmap \
+            else self.__file.read()
+        if self.__data[:len(HEADER)] != HEADER:
+            self.close()
+            raise ValueError(f"{path} is not a turn log")
+
+    def __enter__(self) -> TurnLog:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+        self.__file.close()
+
+    def __iter__(self) -> Iterator[tuple[RecordType, bytes]]:
+        """
+        Records of log, a record cut by crash of the writer is skipped.
+        Only the payload of the current record is copied out of the mapped file
+        """
+        data = self.__data
+        offset = len(HEADER)
+
+        while offset + RECORD.size <= len(data):
+            record_type, length = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if offset + length > len(data):
+                break
+            yield RecordType(record_type), data[offset:offset + length]
+            offset += length
+
+    def get_input(self) -> bytes:
+        return b''.join(payload for record_type, payload in self if record_type == RecordType.INPUT)
+
+    def get_outputs(self) -> list[str]:
+        return [payload.decode() for record_type, payload in self if record_type == RecordType.OUTPUT]
+
+    def input_stream(self) -> LogStream:
+        """
+        Stream of recorded input, chunks come as they were read in the game
+        """
+        return LogStream(payload for record_type, payload in self if record_type == RecordType.INPUT)
+
+
+class LogStream:
+    """
+    Binary stream over input records of log
+    """
+    __records: Iterator[bytes]
+    __rest: bytes
+
+    def __init__(self, records: Iterator[bytes]):
+        self.__records = records
+        self.__rest = b''
+
+    def read1(self, size: int = -1) -> bytes:
+        if not self.__rest:
+            self.__rest = next(self.__records, b'')
+        if size < 0 or size >= len(self.__rest):
+            data, self.__rest = self.__rest, b''
+        else:
+            data, self.__rest = self.__rest[:size], self.__rest[size:]
+        return data
+
+    read = read1
@@ -0,0 +1,497 @@
+from __future__ import annotations
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+import properties
+from collision import get_swept_collisions
+from decisions import Decision
+from game_objects import GameState, FishColor, FishKind
+from telemetry import telemetry
+
+if TYPE_CHECKING:
+    from danger_field import DangerField
+
+
+class VectorReferee:
+    """
+    Referee over struct-of-arrays worlds.
+    All fishes and drones of all worlds are kept in NumPy arrays (worlds, entities, ...)
+    and advanced by batched operations, the rules (and rounding) are the same as in the object-based Referee.
+    Paths of undisturbed fishes are not shared between rollouts: at batch sizes of the search a turn costs
+    the number of NumPy calls, not the number of fishes, and worlds leave a shared path within a few turns
+    """
+    WAIT, MOVE, SURFACE = range(3)
+    CUT_INTERVAL = 4
+    WORLD_ARRAYS = ('fish_position', 'fish_speed', 'swimming', 'drone_position', 'drone_emergency',
+                    'drone_light_radius', 'drone_battery', 'drone_scans', 'plan_action', 'plan_target', 'plan_light',
+                    'scans', 'score', 'running', 'worlds')
+
+    fish_ids: np.ndarray
+    fish_ugly: np.ndarray
+    uglies: np.ndarray
+    fish_habitat: np.ndarray
+    fish_low: np.ndarray
+    fish_high: np.ndarray
+    fish_rewards: np.ndarray
+    color_members: np.ndarray
+    kind_members: np.ndarray
+    scannable: np.ndarray
+    flock: np.ndarray
+    flock_radius2: np.ndarray
+    attack_speed: np.ndarray
+    free_speed: np.ndarray
+    fish_position: np.ndarray
+    fish_speed: np.ndarray
+    swimming: np.ndarray
+
+    drone_ids: np.ndarray
+    drone_player: np.ndarray
+    drone_position: np.ndarray
+    drone_emergency: np.ndarray
+    drone_light_radius: np.ndarray
+    drone_battery: np.ndarray
+    drone_scans: np.ndarray
+
+    plan_action: np.ndarray
+    plan_target: np.ndarray
+    plan_light: np.ndarray
+    step: int
+    worlds: np.ndarray
+
+    scans: np.ndarray
+    score: np.ndarray
+    running: np.ndarray
+    turn: int
+    danger: DangerField | None
+
+    def __init__(self, state: GameState, count: int = 1, danger: DangerField = None):
+        """
+        Referee for batch of worlds, all of them start from the same state
+        :param state: Root state
+        :param count: Number of worlds
+        :param danger: Danger field of root state for all worlds, drones it marks safe are not checked on the first turn
+        """
+        fishes = list(state.fishes.values()) + list(state.lost_fishes.values())
+        drones = list(state.drones.values())
+
+        # Fish metadata, shared by all worlds
+        self.fish_ids = np.array([fish.fish_id for fish in fishes], dtype=np.int64)
+        self.fish_ugly = np.array([fish.kind == FishKind.ANGLER for fish in fishes], dtype=bool)
+        self.uglies = np.flatnonzero(self.fish_ugly)
+        self.fish_habitat = np.array([properties.HABITAT[fish.kind] for fish in fishes], dtype=np.float64)
+        self.fish_habitat = self.fish_habitat.reshape(len(fishes), 2)
+        self.fish_low = np.stack((np.zeros(len(fishes)), self.fish_habitat[:, 0]), axis=1)
+        self.fish_high = np.stack((np.full(len(fishes), properties.MAP_SIZE - 1.0), self.fish_habitat[:, 1]), axis=1)
+        self.fish_rewards = np.array([properties.REWARDS.get(fish.kind, 0) for fish in fishes], dtype=np.int64)
+        self.color_members = np.array([[fish.color == color for fish in fishes]
+                                       for color in FishColor if color != FishColor.UGLY], dtype=bool)
+        self.kind_members = np.array([[fish.kind == kind for fish in fishes]
+                                      for kind in FishKind if kind != FishKind.ANGLER], dtype=bool)
+        self.scannable = ~self.fish_ugly
+
+        # Fish speed rules: ugly moves with other ugly, fish with other fish
+        self.flock = (self.fish_ugly[:, None] == self.fish_ugly[None, :]) & ~np.eye(len(fishes), dtype=bool)
+        self.flock_radius2 = np.where(self.fish_ugly, properties.MIN_DISTANCE_BT_MONSTER ** 2,
+                                      properties.MIN_DISTANCE_BT_FISH ** 2)
+        self.attack_speed = np.where(self.fish_ugly, properties.MONSTER_ATTACK_SPEED,
+                                     properties.FISH_FRIGHTENED_SPEED)
+        self.free_speed = np.where(self.fish_ugly, properties.MONSTER_SPEED, properties.FISH_SPEED)
+
+        # Fish kinematics, undefined speed means that fish stays until somebody kicks it
+        position = np.array([(fish.position.x, fish.position.y) for fish in fishes], dtype=np.float64)
+        speed = np.array([(0, 0) if fish.speed is None else (fish.speed.x, fish.speed.y) for fish in fishes],
+                         dtype=np.float64)
+        self.fish_position = VectorReferee.repeat(position.reshape(len(fishes), 2), count)
+        self.fish_speed = VectorReferee.repeat(speed.reshape(len(fishes), 2), count)
+        self.swimming = VectorReferee.repeat(np.arange(len(fishes)) < len(state.fishes), count)
+
+        # Drones
+        self.drone_ids = np.array([drone.drone_id for drone in drones], dtype=np.int64)
+        self.drone_player = np.array([drone.player_id for drone in drones], dtype=np.int64)
+        position = np.array([(drone.position.x, drone.position.y) for drone in drones], dtype=np.float64)
+        self.drone_position = VectorReferee.repeat(position.reshape(len(drones), 2), count)
+        self.drone_emergency = VectorReferee.repeat(np.array([bool(drone.emergency) for drone in drones],
+                                                             dtype=bool), count)
+        self.drone_light_radius = VectorReferee.repeat(np.array([drone.light_radius for drone in drones],
+                                                                dtype=np.float64), count)
+        self.drone_battery = VectorReferee.repeat(np.array([drone.battery for drone in drones], dtype=np.int64),
+                                                  count)
+        self.drone_scans = VectorReferee.repeat(np.array([[drone.scans >> fish.fish_id & 1 for fish in fishes]
+                                                          for drone in drones], dtype=bool)
+                                                .reshape(len(drones), len(fishes)), count)
+
+        # Players
+        self.scans = VectorReferee.repeat(np.array([[scans >> fish.fish_id & 1 for fish in fishes]
+                                                    for scans in state.scans], dtype=bool)
+                                          .reshape(2, len(fishes)), count)
+        self.score = VectorReferee.repeat(np.array(state.score, dtype=np.int64), count)
+        self.running = np.full(count, True)
+        self.worlds = np.arange(count)
+        self.turn = state.turn
+        self.danger = danger
+
+        # Plans: every drone goes to the surface by default
+        self.plan_action = np.full((count, 1, len(drones)), VectorReferee.SURFACE, dtype=np.int8)
+        self.plan_target = np.zeros((count, 1, len(drones), 2), dtype=np.float64)
+        self.plan_light = np.zeros((count, 1, len(drones)), dtype=bool)
+        self.step = 0
+
+    @staticmethod
+    def repeat(values: np.ndarray, count: int) -> np.ndarray:
+        """
+        Copy values for every world
+        :return: Array (count, *values.shape)
+        """
+        return np.repeat(values[None, ...], count, axis=0)
+
+    def reflect_border(self, speed: np.ndarray) -> np.ndarray:
+        """
+        Reflect speed of fish which would leave the map or their habitat
+        """
+        next_position = self.fish_position + speed
+        return np.where((next_position < self.fish_low) | (next_position > self.fish_high), 0 - speed, speed)
+
+    def update_positions(self) -> None:
+        """
+        Update position for all fishes
+        """
+        position = self.fish_position + self.fish_speed
+        np.maximum(position, self.fish_low, out=position)
+        np.minimum(position, self.fish_high, out=position)
+        self.fish_position = np.where(self.swimming[..., None], position, self.fish_position)
+
+    def update_speed(self) -> None:
+        """
+        Update speed for all fishes
+        """
+        drone_count = len(self.drone_ids)
+        positions = np.concatenate((self.drone_position, self.fish_position), axis=1)
+        delta = self.fish_position[:, :, None, :] - positions[:, None, :, :]
+        dist2 = delta[..., 0] ** 2 + delta[..., 1] ** 2
+
+        # Near drone (light radius for ugly, motor range for other fish)
+        radius2 = np.where(self.fish_ugly[:, None], self.drone_light_radius[:, None, :] ** 2,
+                           properties.MOTOR_RANGE ** 2)
+        candidates = (dist2[..., :drone_count] <= radius2) & ~self.drone_emergency[:, None, :]
+        near_drone = np.logical_or.reduce(candidates, axis=2)
+
+        # Near other fish of the same type, only if there are no drones
+        flock = self.flock & self.swimming[:, None, :] & (dist2[..., drone_count:] <= self.flock_radius2[:, None])
+        candidates = np.concatenate((candidates, flock & ~near_drone[..., None]), axis=2)
+
+        # Closest positions with equal distance
+        dist2 = np.where(candidates, dist2, np.inf)
+        closest = candidates & (dist2 == dist2.min(axis=2, keepdims=True))
+        count = closest.sum(axis=2)
+        near = count > 0
+        mean = (closest @ positions) / np.maximum(count, 1)[..., None]
+
+        # Direction and length of speed for every case
+        direction = np.where(near[..., None], self.fish_position - mean, self.fish_speed)
+        attack = near_drone & self.fish_ugly
+        direction = np.where(attack[..., None], -direction, direction)
+        length = np.where(near_drone, self.attack_speed, np.where(near, properties.FISH_SPEED, self.free_speed))
+        norm = np.sqrt(direction[..., 0] ** 2 + direction[..., 1] ** 2)
+        speed = np.divide(direction, norm[..., None], out=np.zeros_like(direction), where=norm[..., None] > 0)
+        speed *= length[..., None]
+
+        # Ugly speed is rounded before border check and slow ugly keeps speed
+        rounded = near_drone | self.fish_ugly
+        slow = self.fish_ugly & ~near & (norm <= properties.MONSTER_SPEED)
+        speed = np.where(slow[..., None], self.fish_speed, np.where(rounded[..., None], np.rint(speed), speed))
+
+        # Border, frightened fish ignore it
+        speed = np.where(near_drone[..., None], speed, self.reflect_border(speed))
+        speed = np.where(rounded[..., None], speed, np.rint(np.rint(speed * 10000000.0) / 10000000.0))
+
+        self.fish_speed = np.where(self.swimming[..., None], speed, self.fish_speed)
+
+    def remove_to_lost(self) -> None:
+        """
+        Remove fish if it goes beyond the map
+        """
+        next_x = self.fish_position[..., 0] + self.fish_speed[..., 0]
+        self.swimming &= self.fish_ugly | ((next_x >= 0) & (next_x <= properties.MAP_SIZE - 1))
+
+    def do_scan(self) -> None:
+        """
+        Scan fish with drones within the lighting radius
+        """
+        delta = self.drone_position[:, :, None, :] - self.fish_position[:, None, :, :]
+        in_light = delta[..., 0] ** 2 + delta[..., 1] ** 2 <= self.drone_light_radius[..., None] ** 2
+        active = ~self.drone_emergency & self.running[:, None]
+        self.drone_scans |= (in_light & active[..., None] & (self.swimming & self.scannable)[:, None, :]
+                             & ~self.scans[:, self.drone_player])
+
+    def do_report(self, end: np.ndarray | bool = False) -> None:
+        """
+        Save fish on a surface
+        :param end: Save fish anywhere, for all worlds or bool array of worlds
+        """
+        surface = ((self.drone_position[..., 1] <= properties.SURFACE) | np.reshape(end, (-1, 1))) \
+            & self.running[:, None]
+        if not self.drone_scans[surface].any():
+            return
+
+        # get union scans and remove already scanned fish
+        scans = [np.any(self.drone_scans & (surface & (self.drone_player == player_id))[..., None], axis=1)
+                 & ~self.scans[:, player_id] for player_id in range(2)]
+        self.drone_scans[surface] = False
+
+        # determinate first scan (not in enemy drone scans and saved scans)
+        scans_bonus = (scans[0] & ~scans[1] & ~self.scans[:, 1],
+                       scans[1] & ~scans[0] & ~self.scans[:, 0])
+
+        # apply scans
+        self.apply_scans(0, scans[0] & ~scans_bonus[0])
+        self.apply_scans(1, scans[1] & ~scans_bonus[1])
+        self.apply_scans(0, scans_bonus[0], True)
+        self.apply_scans(1, scans_bonus[1], True)
+
+    def apply_scans(self, player_id: int, scans: np.ndarray, bonus: bool = False) -> None:
+        """
+        Apply scans to state scans and increase score
+        :param player_id: Apply for player
+        :param scans: Bool array (worlds, fishes)
+        :param bonus: It is first scan with bonus
+        """
+        if not scans.any():
+            return
+
+        koef = 2 if bonus else 1
+        saved = self.scans[:, player_id] | scans
+        self.scans[:, player_id] = saved
+
+        score = scans @ self.fish_rewards
+        score += properties.REWARDS_COLOR * np.sum(np.any(self.color_members & scans[:, None, :], axis=2)
+                                                   & np.all(saved[:, None, :] | ~self.color_members, axis=2), axis=1)
+        score += properties.REWARDS_KIND * np.sum(np.any(self.kind_members & scans[:, None, :], axis=2)
+                                                  & np.all(saved[:, None, :] | ~self.kind_members, axis=2), axis=1)
+        self.score[:, player_id] += score * koef
+
+    def get_max_scores(self, player_id: int, reach: float) -> np.ndarray:
+        """
+        Upper bound of score which player can get until the end of the game, same as Referee.get_score_bounds
+        :param reach: Distance to fishes which drones of player can scan
+        :return: Array of worlds
+        """
+        saved = self.scans[:, player_id]
+        drones = self.drone_player == player_id
+        delta = self.drone_position[:, drones, None, :] - self.fish_position[:, None, :, :]
+        reachable = (delta[..., 0] ** 2 + delta[..., 1] ** 2 <= reach * reach).any(axis=1)
+        scans = (self.swimming & self.scannable & reachable | self.drone_scans[:, drones].any(axis=1)) & ~saved
+        first = scans & ~self.scans[:, 1 - player_id]
+        complete = saved | scans
+
+        score = scans @ self.fish_rewards + first @ self.fish_rewards
+        for members, reward in ((self.color_members, properties.REWARDS_COLOR),
+                                (self.kind_members, properties.REWARDS_KIND)):
+            completed = np.all(complete[:, None, :] | ~members, axis=2) & ~np.all(saved[:, None, :] | ~members, axis=2)
+            score += 2 * reward * completed.sum(axis=1)
+        return score
+
+    def get_score_bounds(self, turns: int = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Bounds of player score difference which can be reached until the end of the game, same as Referee
+        :param turns: Number of turns left, default is until end of game
+        :return: Arrays of min and max difference
+        """
+        if turns is None:
+            turns = properties.MAX_TURN - self.turn + 1
+        turns = min(turns, properties.MAX_TURN - self.turn + 1)
+        # speeds are rounded, so 1 more per turn for drone and for fish
+        reach = turns * (properties.DRONE_MAX_SPEED + properties.FISH_FRIGHTENED_SPEED + 2) + properties.LIGHT_SCAN_RADIUS
+
+        difference = self.score[:, 0] - self.score[:, 1]
+        return difference - self.get_max_scores(1, reach), difference + self.get_max_scores(0, reach)
+
+    def is_game_over(self) -> np.ndarray:
+        """
+        Check if the game is over
+        :return: Bool array of worlds
+        """
+        if self.turn > properties.MAX_TURN:
+            return np.full(len(self.running), True)
+
+        fishes = self.swimming & self.scannable
+        return ~self.drone_scans.any(axis=(1, 2)) & ~(fishes & ~(self.scans[:, 0] & self.scans[:, 1])).any(axis=1)
+
+    def set_plans(self, decisions: list[list[Decision]]) -> None:
+        """
+        Encode plans of all worlds to arrays (worlds, turns, drones), the last turn is default one
+        :param decisions: Plan for every world
+        """
+        drone_index = {drone_id: i for i, drone_id in enumerate(self.drone_ids)}
+        turns = max((Decision.get_length(plan) for plan in decisions), default=0) + 1
+        shape = len(decisions), turns, len(drone_index)
+
+        self.plan_action = np.full(shape, VectorReferee.SURFACE, dtype=np.int8)
+        self.plan_target = np.zeros(shape + (2,), dtype=np.float64)
+        self.plan_light = np.zeros(shape, dtype=bool)
+
+        for world, plan in enumerate(decisions):
+            starts = {}
+            for decision in plan:
+                drone = drone_index[decision.drone_id]
+                start = starts.get(drone, 0)
+                starts[drone] = start + decision.turns
+
+                turns = slice(start, start + decision.turns)
+                if decision.position is None:
+                    self.plan_action[world, turns, drone] = VectorReferee.WAIT
+                else:
+                    self.plan_action[world, turns, drone] = VectorReferee.MOVE
+                    self.plan_target[world, turns, drone] = decision.position
+                self.plan_light[world, turns, drone] = decision.light
+
+    def get_collisions(self, drone_speed: np.ndarray) -> np.ndarray:
+        """
+        Drones which are caught by ugly during the turn, same as Referee.is_collision
+        :param drone_speed: Speed of drones (K, drones, 2)
+        :return: Bool array (K, drones)
+        """
+        near = True
+        if self.step == 0 and self.danger is not None:
+            near = ~self.danger.get_safe(self.drone_position, self.drone_position + drone_speed)
+            if not near.any():
+                return near
+
+        position, speed = self.fish_position[:, self.uglies], self.fish_speed[:, self.uglies]
+        # broad phase: no pair is closer than attack radius and both the fastest moves
+        reach = properties.MONSTER_ATTACK_RADIUS + np.sqrt((speed * speed).sum(axis=-1).max(initial=0)) \
+            + np.sqrt((drone_speed * drone_speed).sum(axis=-1).max(initial=0))
+        delta = position[:, None, :, :] - self.drone_position[:, :, None, :]
+        if not ((delta * delta).sum(axis=-1) <= reach * reach).any():
+            return np.zeros(self.drone_emergency.shape, dtype=bool)
+        hit, _ = get_swept_collisions(self.drone_position, self.drone_position + drone_speed,
+                                      position, position + speed)
+        return (hit & self.swimming[:, None, self.uglies]).any(axis=2) & near
+
+    def update_drone(self) -> None:
+        """
+        Update drone light, battery, speed and position by plans
+        """
+        step = min(self.step, self.plan_action.shape[1] - 1)
+        action = self.plan_action[:, step]
+        light = self.plan_light[:, step]
+
+        # Light
+        lighting = light & ~self.drone_emergency & (self.drone_battery >= properties.BATTERY_DRAIN)
+        self.drone_battery = np.where(lighting, self.drone_battery - properties.BATTERY_DRAIN,
+                                      np.minimum(self.drone_battery + properties.BATTERY_RECHARGE,
+                                                 properties.MAX_BATTERY))
+        self.drone_light_radius = np.where(lighting, properties.LIGHT_SCAN_RADIUS, properties.DARK_SCAN_RADIUS)
+
+        # Speed to target
+        target = np.where((action == VectorReferee.SURFACE)[..., None], self.drone_position * (1, 0),
+                          self.plan_target[:, step])
+        speed = target - self.drone_position
+        norm = np.sqrt(speed[..., 0] ** 2 + speed[..., 1] ** 2)[..., None]
+        limited = norm > properties.DRONE_MAX_SPEED
+        speed = np.rint(np.where(limited, speed / np.where(limited, norm, 1) * properties.DRONE_MAX_SPEED, speed))
+
+        speed = np.where((action == VectorReferee.WAIT)[..., None], (0, properties.DRONE_SINK_SPEED), speed)
+        speed = np.where(self.drone_emergency[..., None], (0, -properties.DRONE_EMERGENCY_SPEED), speed)
+
+        # Ugly attack, drone loses its scans
+        hit = self.get_collisions(speed) & ~self.drone_emergency & self.running[:, None]
+        self.drone_emergency |= hit
+        self.drone_scans &= ~hit[..., None]
+
+        # Position
+        self.drone_position = np.where(self.running[:, None, None],
+                                       np.minimum(np.maximum(self.drone_position + speed, 0),
+                                                  properties.MAP_SIZE - 1),
+                                       self.drone_position)
+
+        # Drone is repaired on the surface
+        self.drone_emergency &= self.drone_position[..., 1] != 0
+
+    @staticmethod
+    def simulate(state: GameState, decisions: list[Decision], depth: int = None) -> int:
+        """
+        Simulate state until end of game, same as Referee.simulate
+        :param state: State for simulation
+        :param decisions: Plan on how to move drones
+        :param depth: Number of turns to simulate, default is until end of game
+        :return: Player score difference at the end of the game
+        """
+        return int(VectorReferee.simulate_batch(state, [decisions], depth)[0])
+
+    @staticmethod
+    def simulate_batch(state: GameState, decisions: list[list[Decision]], depth: int = None,
+                       threshold: int = None) -> np.ndarray:
+        """
+        Simulate all plans in lockstep until end of game
+        :param state: Root state for all simulations
+        :param decisions: List of candidate plans
+        :param depth: Number of turns to simulate, then all scanned fish are saved as at the end of the game.
+        Default is until end of game
+        :param threshold: World stops when its difference surely can't be greater, then upper bound is returned
+        :return: Array of player score differences at the end of the game, one per plan
+        """
+        referee = VectorReferee(state, len(decisions))
+        referee.set_plans(decisions)
+        return referee.play(depth, threshold)
+
+    def play(self, depth: int = None, threshold: int = None, stop: threading.Event = None) -> np.ndarray | None:
+        """
+        Simulate all worlds by their plans in lockstep until end of game
+        :param depth: Number of turns to simulate, then all scanned fish are saved as at the end of the game.
+        Default is until end of game
+        :param threshold: World stops when its difference surely can't be greater, then upper bound is returned.
+        Bounds are checked every CUT_INTERVAL turns, stopped worlds are dropped from arrays (see worlds)
+        :param stop: Simulation is aborted when it is set
+        :return: Array of player score differences at the end of the game, one per world. None if it was aborted
+        """
+        telemetry.add('simulations', len(self.running))
+        result = np.zeros(len(self.running), dtype=np.int64)
+
+        # game loop, every world stops on its own game over
+        while self.running.any():
+            over = self.is_game_over() & self.running
+            if depth is not None and self.step >= depth:
+                over = self.running.copy()
+            if over.any():
+                # in end of the game, save all scanned fish
+                self.do_report(over)
+                self.running &= ~over
+                continue
+
+            if threshold is not None and self.step % VectorReferee.CUT_INTERVAL == 0:
+                _, high = self.get_score_bounds(None if depth is None else depth - self.step)
+                cut = self.running & (high <= threshold)
+                if cut.any():
+                    done = ~self.running | cut
+                    result[self.worlds[done]] = np.where(cut, high, self.score[:, 0] - self.score[:, 1])[done]
+                    self.drop_worlds(done)
+                    continue
+
+            if stop is not None and stop.is_set():
+                return None
+
+            if telemetry.enabled:
+                telemetry.add('sim_turns', int(self.running.sum()))
+            self.remove_to_lost()
+            self.update_drone()
+            self.update_positions()
+            self.update_speed()
+            self.do_scan()
+            self.do_report()
+            self.turn += 1
+            self.step += 1
+
+        result[self.worlds] = self.score[:, 0] - self.score[:, 1]
+        return result
+
+    def drop_worlds(self, drop: np.ndarray) -> None:
+        """
+        Remove worlds from all arrays, indexes of the rest in the batch are kept in worlds
+        :param drop: Bool array of worlds
+        """
+        keep = ~drop
+        for name in VectorReferee.WORLD_ARRAYS:
+            setattr(self, name, getattr(self, name)[keep])
+